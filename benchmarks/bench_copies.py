@@ -0,0 +1,64 @@
+"""Peak RSS of the modeling-frame and time-heatmap prep, with and without the full-frame copies.
+
+Old: cell 71 ``uber_data.copy()`` + cell 76 ``drop``, cell 44 ``uber_data[i].copy()``.
+New: column projection and ``.loc`` with only the needed columns.
+
+    python benchmarks/bench_copies.py --rows 2000000
+"""
+import argparse
+import gc
+
+from benchmarks.bench_memory import notebook_frame
+from uber_analysis.features import quarter_hour_time
+from uber_analysis.heatmaps import heatmap_frames
+from uber_analysis.profiling import memory_table, track_memory
+
+
+def modeling_old(uber_data):
+    df = uber_data.copy()
+    df['WeekDay'] = df['Date/Time'].dt.weekday
+    df['Time'] = quarter_hour_time(df['Date/Time'])
+    df['Day'] = df['Date/Time'].dt.day
+    df = df.drop(['Date/Time', 'BinnedHour', 'Date', 'Distance MM', 'Distance ESB', 'Lat', 'Lon'], axis=1)
+    return df
+
+
+def modeling_new(uber_data):
+    df = uber_data[['Date/Time', 'Base']]
+    df['WeekDay'] = df['Date/Time'].dt.weekday
+    df['Time'] = quarter_hour_time(df['Date/Time'])
+    df['Day'] = df['Date/Time'].dt.day
+    del df['Date/Time']
+    return df
+
+
+def heatmap_old(uber_data, i):
+    map_data = uber_data[i].copy()
+    map_data['Weight'] = 0.1
+    return heatmap_frames(map_data, weights=map_data['Weight'])
+
+
+def heatmap_new(uber_data, i):
+    return heatmap_frames(uber_data.loc[i, ['Lat', 'Lon', 'BinnedHour']])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--radius', type=float, default=2.0)
+    args = parser.parse_args()
+
+    uber_data = notebook_frame(args.rows)
+    i = (uber_data[['Distance MM', 'Distance ESB']] < args.radius).any(axis=1)
+    usages = {}
+    for name, fn in [('model old', lambda: modeling_old(uber_data)), ('model new', lambda: modeling_new(uber_data)),
+                     ('heatmap old', lambda: heatmap_old(uber_data, i)), ('heatmap new', lambda: heatmap_new(uber_data, i))]:
+        gc.collect()
+        with track_memory() as usage:
+            fn()
+        usages[name] = usage
+    print(memory_table(usages))
+
+
+if __name__ == '__main__':
+    main()
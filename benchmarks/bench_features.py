@@ -0,0 +1,58 @@
+"""Cell 73 ``apply(func)`` + cell 80 row-wise ``Weekend`` vs. ``time_features``.
+
+Their parity is checked in tests/test_features.py.
+
+    python benchmarks/bench_features.py --rows 1000000 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from uber_analysis.features import time_features
+
+
+def func(x):
+    hr = float(x.hour)
+    minute = int(x.minute/15)
+    return hr + minute/4
+
+
+def random_stamps(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(pd.Timestamp('2014-07-01') + pd.to_timedelta(rng.integers(0, 31*86400, rows), unit='s'))
+
+
+def rowwise(stamps):
+    df = pd.DataFrame({'Date/Time': stamps})
+    df['WeekDay'] = df['Date/Time'].dt.weekday
+    df['Time'] = df['Date/Time'].apply(func)
+    df['Day'] = df['Date/Time'].dt.day
+    df['Weekend'] = df.apply(lambda x: 1 if(x['WeekDay'] > 4) else 0, axis=1)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--rowwise-rows', type=int, default=100000,
+                        help='rows timed on the slow path, extrapolated linearly')
+    args = parser.parse_args()
+
+    stamps = random_stamps(args.rowwise_rows)
+    start = time.perf_counter()
+    rowwise(stamps)
+    per_row = (time.perf_counter() - start) / args.rowwise_rows
+
+    for rows in args.rows:
+        stamps = random_stamps(rows)
+        start = time.perf_counter()
+        features = time_features(stamps)
+        elapsed = time.perf_counter() - start
+        print('%10d rows: vectorized %6.2fs, row-wise ~%7.1fs (extrapolated), %5.1f MB of features'
+              % (rows, elapsed, per_row*rows, features.memory_usage().sum() / 2**20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Next-day forecasting: training time, nightly refit time, predictions per second and accuracy.
+
+    python benchmarks/bench_forecast.py --rows 4000000 --days 91 --holdout 14
+"""
+import argparse
+import time
+
+import numpy as np
+
+from uber_analysis.cube import CountCube
+from uber_analysis.forecast import MODELS, backtest, feature_matrix, min_history
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=4000000)
+    parser.add_argument('--days', type=int, default=91)
+    parser.add_argument('--holdout', type=int, default=14)
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=MODELS)
+    args = parser.parse_args()
+
+    cube = CountCube.from_frame(synthetic_pickups(args.rows, days=args.days))
+    start = time.perf_counter()
+    X, _ = feature_matrix(cube)
+    print('%d days x %d slots x %d bases: %d x %d feature matrix in %.3fs'
+          % (cube.counts.shape + X.shape + (time.perf_counter() - start,)))
+
+    for model in args.models:
+        try:
+            forecaster, table = backtest(cube, model, args.holdout)
+        except ImportError as exc:
+            print('%-5s skipped (%s)' % (model, exc))
+            continue
+        first = table.iloc[0]
+        refits = table['train_seconds'].iloc[1:]
+        forecaster.predict_matrix(X)
+        print('%-5s full fit %.3fs on %d rows, nightly refit %.4fs mean, %.0f predictions/s, '
+              'WAPE %.3f (seasonal naive %.3f), RMSE %.2f'
+              % (model, first['train_seconds'], first['train_rows'], refits.mean(), forecaster.predict_rate,
+                 table['wape'].mean(), table['naive_wape'].mean(), np.sqrt((table['rmse']**2).mean())))
+    print('(history before the holdout: %d days, first %d used for lags only)'
+          % (cube.counts.shape[0] - args.holdout, min_history(cube)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Row-wise ``apply(haversine)`` (cell 30) vs. the vectorized matrix version.
+
+    python benchmarks/bench_haversine.py --rows 800000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from uber_analysis.distance import LANDMARKS, haversine, landmark_distances
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--rowwise-rows', type=int, default=None,
+                        help='rows to time on the slow path (default: same as --rows)')
+    args = parser.parse_args()
+
+    data = synthetic_pickups(args.rows)
+    slow = data.iloc[:args.rowwise_rows or args.rows]
+
+    start = time.perf_counter()
+    rowwise = pd.DataFrame({'Distance ' + name: slow[['Lat', 'Lon']].apply(lambda x: haversine(coords, tuple(x)), axis=1)
+                            for name, coords in LANDMARKS.items()})
+    t_rowwise = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = landmark_distances(data)
+    t_vec = time.perf_counter() - start
+
+    err = np.abs(vectorized.iloc[:len(slow)].to_numpy() - rowwise.to_numpy()).max()
+    per_row = t_rowwise / len(slow)
+    print('rows: %d (row-wise on %d)' % (len(data), len(slow)))
+    print('row-wise apply : %8.3fs  (%.2fs extrapolated to all rows)' % (t_rowwise, per_row*len(data)))
+    print('vectorized     : %8.3fs' % t_vec)
+    print('speedup        : %8.1fx' % (per_row*len(data) / t_vec))
+    print('max abs diff   : %.3g mi' % err)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""HTML size and render-prep time of the folium heatmaps: raw points vs. grid cells.
+
+    python benchmarks/bench_heatmaps.py --rows 800000
+"""
+import argparse
+import time
+
+import folium
+from folium.plugins import HeatMap, HeatMapWithTime
+
+from uber_analysis.distance import metro_art_coordinates
+from uber_analysis.heatmaps import heatmap_frames, heatmap_points
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def render(label, build):
+    start = time.perf_counter()
+    layer, points = build()
+    uber_map = folium.Map(location=metro_art_coordinates, zoom_start=10)
+    layer.add_to(uber_map)
+    html = uber_map.get_root().render()
+    print('%-34s %9d points %9.1f MB %7.2fs' % (label, points, len(html) / 2**20, time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=800000)
+    parser.add_argument('--cell-deg', type=float, default=0.005)
+    parser.add_argument('--max-points', type=int, default=20000)
+    args = parser.parse_args()
+    data = synthetic_pickups(args.rows)
+    data['BinnedHour'] = data['Date/Time'].dt.floor('15min')
+
+    def raw():
+        points = data[['Lat', 'Lon']].to_numpy()
+        return HeatMap(points, radius=10), len(points)
+
+    def gridded(grid):
+        points = heatmap_points(data['Lat'], data['Lon'], cell_deg=args.cell_deg, grid=grid,
+                                max_points=args.max_points)
+        return HeatMap(points, radius=10), len(points)
+
+    def raw_with_time():
+        first_week = data[data['BinnedHour'] < '2014-07-08']
+        frames = first_week.groupby('BinnedHour').apply(
+            lambda x: x[['Lat', 'Lon']].sample(int(len(x)/3)).to_numpy().tolist())
+        return HeatMapWithTime(frames.tolist()), sum(len(f) for f in frames)
+
+    def gridded_with_time():
+        frames = heatmap_frames(data, cell_deg=args.cell_deg*2, max_points=500)
+        return HeatMapWithTime(frames.data, index=frames.index), sum(len(f) for f in frames.data)
+
+    render('HeatMap, raw points', raw)
+    render('HeatMap, square grid', lambda: gridded('square'))
+    render('HeatMap, hex grid', lambda: gridded('hex'))
+    render('HeatMapWithTime, 1/3 sample, wk 1', raw_with_time)
+    render('HeatMapWithTime, grid, full month', gridded_with_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Hotspot clustering per BinnedHour window: scaling with row count and workers.
+
+Times ``hotspots`` over growing synthetic samples and prints the cost per
+row relative to the smallest size (1.00 = perfectly linear), the peak RSS
+growth and, for one window, the agreement with scikit-learn's exact
+haversine DBSCAN when it is installed.
+
+    python benchmarks/bench_hotspots.py --rows 500000 1000000 2000000 4000000 --workers 1 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from uber_analysis.hotspots import DEFAULT_EPS_MILES, grid_dbscan, hotspots
+from uber_analysis.distance import EARTH_RADIUS_MI
+from uber_analysis.profiling import track_memory
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def exact_check(data, eps_miles, min_samples):
+    """Largest hotspots of one evening hour: grid DBSCAN vs. sklearn's ball-tree DBSCAN."""
+    try:
+        from sklearn.cluster import DBSCAN
+    except ImportError:
+        return
+    stamps = data['Date/Time']
+    window = data[(stamps.dt.hour == 18) & (stamps.dt.day <= 3)]
+    lat, lon = window['Lat'].to_numpy(np.float64), window['Lon'].to_numpy(np.float64)
+    start = time.perf_counter()
+    _, g_lat, g_lon, g_size, _ = grid_dbscan(lat, lon, eps_miles=eps_miles, min_samples=min_samples)
+    t_grid = time.perf_counter() - start
+    start = time.perf_counter()
+    labels = DBSCAN(eps=eps_miles / EARTH_RADIUS_MI, min_samples=min_samples, metric='haversine',
+                    algorithm='ball_tree').fit_predict(np.radians(np.column_stack([lat, lon])))
+    t_exact = time.perf_counter() - start
+    ids, sizes = np.unique(labels[labels >= 0], return_counts=True)
+    print('exact check on %d points: grid %.3fs, sklearn %.2fs' % (len(lat), t_grid, t_exact))
+    for rank, k in enumerate(np.argsort(-g_size)[:3]):
+        exact = ids[np.argsort(-sizes)][rank]
+        member = labels == exact
+        print('  #%d grid (%.4f, %.4f) %5d pts | exact (%.4f, %.4f) %5d pts'
+              % (rank, g_lat[k], g_lon[k], g_size[k], lat[member].mean(), lon[member].mean(), member.sum()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[500000, 1000000, 2000000, 4000000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1])
+    parser.add_argument('--eps', type=float, default=DEFAULT_EPS_MILES)
+    parser.add_argument('--min-samples', type=int, default=20)
+    args = parser.parse_args()
+
+    baseline = None
+    for rows in args.rows:
+        data = synthetic_pickups(rows)
+        binned = data['Date/Time'].dt.floor('15min').rename('BinnedHour')
+        for workers in args.workers:
+            with track_memory() as usage:
+                start = time.perf_counter()
+                found = hotspots(data, args.eps, args.min_samples, times=binned, workers=workers)
+                elapsed = time.perf_counter() - start
+            per_row = elapsed / rows
+            baseline = baseline or per_row
+            print('%9d rows, %d worker(s): %6.2fs (%.2f us/row, x%.2f of linear), +%.0f MB peak, '
+                  '%d hotspots in %d windows'
+                  % (rows, workers, elapsed, per_row*1e6, per_row / baseline, usage.peak_delta / 2**20,
+                     len(found), found['BinnedHour'].nunique()))
+    exact_check(data, args.eps, max(args.min_samples, 30))
+
+
+if __name__ == '__main__':
+    main()
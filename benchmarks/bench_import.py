@@ -0,0 +1,43 @@
+"""Interpreter startup + import time: the notebook's imports vs. the CLI.
+
+Each case runs in a fresh interpreter so nothing is already imported.
+
+    python benchmarks/bench_import.py
+"""
+import subprocess
+import sys
+import time
+
+CASES = [
+    ('notebook imports (cell 2)',
+     'import numpy, pandas, matplotlib.pyplot, seaborn, geopy.distance, folium, folium.plugins, scipy.stats'),
+    ('import uber_analysis.cli', 'import uber_analysis.cli'),
+    ('compute stages imports',
+     'import uber_analysis.cli, uber_analysis.ingest, uber_analysis.cube, uber_analysis.distance, '
+     'uber_analysis.proximity, uber_analysis.stats, uber_analysis.features, uber_analysis.heatmaps'),
+    ('plot stages imports', 'import matplotlib.pyplot, seaborn, folium, folium.plugins'),
+]
+
+
+def timed(code, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    baseline = timed('pass', repeat)
+    print('%-28s %6.3fs' % ('bare interpreter', baseline))
+    for label, code in CASES:
+        try:
+            print('%-28s %6.3fs' % (label, timed(code, repeat)))
+        except subprocess.CalledProcessError:
+            print('%-28s   (not installed)' % label)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Startup cost: cells 3 + 6 vs. the cached ingest layer.
+
+    python benchmarks/bench_ingest.py uber-raw-data-jul14.csv
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from uber_analysis.ingest import load_pickups
+from uber_analysis.synthetic import synthetic_pickups, write_raw_csv
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    frame = fn()
+    print('%-28s %7.2fs  %7.1f MB' % (label, time.perf_counter() - start,
+                                     frame.memory_usage(deep=True).sum() / 2**20))
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('csv', nargs='?', help='raw CSV (a synthetic one is generated if omitted)')
+    parser.add_argument('--rows', type=int, default=800000)
+    parser.add_argument('--format', choices=['feather', 'parquet'], default='feather')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = args.csv
+        if path is None:
+            path = os.path.join(workdir, 'uber-raw-data-jul14.csv')
+            write_raw_csv(synthetic_pickups(args.rows), path)
+        cache_dir = os.path.join(workdir, 'cache')
+
+        def notebook():
+            frame = pd.read_csv(path)
+            frame['Date/Time'] = pd.to_datetime(frame['Date/Time'])
+            return frame
+
+        timed('read_csv + to_datetime', notebook)
+        timed('cold (parse + write cache)', lambda: load_pickups(path, cache_dir, args.format))
+        timed('warm (memory-mapped cache)', lambda: load_pickups(path, cache_dir, args.format))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Cell 26's exact Gaussian KDE (what ``sns.histplot(kde=True)`` runs) vs. the binned FFT KDE.
+
+Exact evaluation is O(points x gridsize); above ``--exact-max`` points it is
+timed on a subsample and scaled linearly (marked ``~``). The reported error
+is the largest deviation from the exact curve relative to its peak, measured
+on the largest exactly evaluated size.
+
+    python benchmarks/bench_kde.py --rows 1000000 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+from scipy.stats import gaussian_kde
+
+from uber_analysis.kde import kde_1d, kde_2d
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def exact_1d(x, support):
+    kde = gaussian_kde(x)
+    return kde(support)
+
+
+def exact_2d(x, y, support_x, support_y):
+    kde = gaussian_kde([x, y])
+    xx, yy = np.meshgrid(support_x, support_y)
+    return kde([xx.ravel(), yy.ravel()]).reshape(xx.shape)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 10000000])
+    parser.add_argument('--exact-max', type=int, default=1000000,
+                        help='largest 1D sample evaluated exactly')
+    parser.add_argument('--exact-max-2d', type=int, default=20000,
+                        help='largest 2D sample evaluated exactly (200 x 200 support points)')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        data = synthetic_pickups(rows)
+        lat = data['Lat'].to_numpy(np.float64)
+        lon = data['Lon'].to_numpy(np.float64)
+        del data
+
+        (density, support), t_fft = timed(kde_1d, lat)
+        sub = min(rows, args.exact_max)
+        fft_sub, support_sub = kde_1d(lat[:sub])
+        reference, t_exact = timed(exact_1d, lat[:sub], support_sub)
+        error = np.abs(fft_sub - reference).max() / reference.max()
+        scaled = '~' if sub < rows else ' '
+        print('%9d points 1D: FFT %6.3fs, exact %s%8.2fs (%5.0fx), max error %.2e'
+              % (rows, t_fft, scaled, t_exact*rows / sub, t_exact*rows / sub / t_fft, error))
+
+        (density, support), t_fft = timed(kde_2d, lat, lon)
+        sub = min(rows, args.exact_max_2d)
+        fft_sub, (sx, sy) = kde_2d(lat[:sub], lon[:sub])
+        reference, t_exact = timed(exact_2d, lat[:sub], lon[:sub], sx, sy)
+        error = np.abs(fft_sub - reference).max() / reference.max()
+        scaled = '~' if sub < rows else ' '
+        print('%9d points 2D: FFT %6.3fs, exact %s%8.2fs (%5.0fx), max error %.2e'
+              % (rows, t_fft, scaled, t_exact*rows / sub, t_exact*rows / sub / t_fft, error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Nearest-landmark and radius-sweep queries: KD-tree engine vs. the N x M distance matrix.
+
+    python benchmarks/bench_landmarks.py --rows 1000000 --landmarks 2 100 10000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from uber_analysis.distance import haversine_matrix
+from uber_analysis.landmarks import ProximityEngine
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def random_landmarks(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return {'L%d' % i: (rng.uniform(40.60, 40.85), rng.uniform(-74.05, -73.75)) for i in range(count)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--landmarks', type=int, nargs='+', default=[2, 100, 10000])
+    parser.add_argument('--matrix-max', type=float, default=2e8,
+                        help='largest N x M matrix to time on the brute-force path')
+    args = parser.parse_args()
+
+    data = synthetic_pickups(args.rows)
+    lat, lon = data['Lat'].to_numpy(), data['Lon'].to_numpy()
+    radii = np.arange(0.1, 5.1, 0.1)
+
+    for count in args.landmarks:
+        landmarks = random_landmarks(count)
+        start = time.perf_counter()
+        engine = ProximityEngine(landmarks)
+        engine.nearest(lat, lon)
+        t_nearest = time.perf_counter() - start
+        start = time.perf_counter()
+        engine.counts_within(lat, lon, radii)
+        t_counts = time.perf_counter() - start
+
+        if args.rows*count <= args.matrix_max:
+            start = time.perf_counter()
+            dist = haversine_matrix(lat, lon, landmarks, out=np.empty((len(lat), count), dtype=np.float32))
+            dist.argmin(axis=1)
+            [(dist < r).sum(axis=0) for r in radii]
+            matrix = '%7.2fs' % (time.perf_counter() - start)
+        else:
+            matrix = 'skipped (%.1f GB matrix)' % (args.rows*count*4 / 2**30)
+        print('M=%-6d nearest %6.2fs, radius sweep %6.2fs, N x M matrix %s' % (count, t_nearest, t_counts, matrix))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Memory of the notebook's ``uber_data`` (after cell 41) vs. ``compact_pickups``.
+
+    python benchmarks/bench_memory.py --rows 800000
+"""
+import argparse
+
+import pandas as pd
+
+from uber_analysis.distance import LANDMARKS, landmark_distances
+from uber_analysis.schema import compact_pickups, memory_report
+from uber_analysis.synthetic import synthetic_pickups
+
+DayMap = {0: 'Monday', 1: 'Tuesday', 2: 'Wednesday', 3: 'Thursday', 4: 'Friday', 5: 'Saturday', 6: 'Sunday'}
+
+
+def notebook_frame(rows, seed=0):
+    uber_data = synthetic_pickups(rows, seed=seed)
+    uber_data['Base'] = uber_data['Base'].astype(str).astype(object)
+    uber_data['BinnedHour'] = uber_data['Date/Time'].dt.floor('15min')
+    uber_data['Day'] = uber_data['BinnedHour'].dt.weekday.map(DayMap)
+    uber_data['Date'] = uber_data['BinnedHour'].dt.date
+    uber_data['Day'] = pd.Categorical(uber_data['Day'], categories=list(DayMap.values()), ordered=True)
+    uber_data['Time'] = uber_data['BinnedHour'].dt.time
+    uber_data[['Distance MM', 'Distance ESB']] = landmark_distances(uber_data, LANDMARKS)
+    uber_data['Weight'] = 0.5
+    return uber_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=800000)
+    parser.add_argument('--year-rows', type=int, default=12*800000,
+                        help='rows used for the full-year extrapolation')
+    args = parser.parse_args()
+
+    before = notebook_frame(args.rows)
+    after = compact_pickups(before)
+    report = memory_report(before, after)
+    print(report.to_string())
+    per_row = report.loc['bytes/row']
+    print('\nfull year (%d rows): %.2f GB before, %.2f GB after'
+          % (args.year_rows, per_row['before']*args.year_rows / 2**30, per_row['after']*args.year_rows / 2**30))
+
+
+if __name__ == '__main__':
+    main()
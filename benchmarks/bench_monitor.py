@@ -0,0 +1,103 @@
+"""Live demand monitor: per-event latency and memory while replaying a pickup stream.
+
+Builds the weekday/slot baseline from one synthetic July, writes the given
+number of August days at the same daily volume to a CSV with a surge
+injected, and replays it through the asyncio file tail. Memory is sampled
+before and after to show it does not grow with the stream length.
+
+    python benchmarks/bench_monitor.py --history 1000000 --days 7 28
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from uber_analysis.cube import CountCube
+from uber_analysis.monitor import Baseline, DemandMonitor, tail_file
+from uber_analysis.profiling import current_rss
+from uber_analysis.synthetic import BASES, synthetic_pickups, write_raw_csv
+
+
+def live_stream(path, events, days, surge_at='2014-08-04 18:05', surge=500):
+    live = synthetic_pickups(events, start='2014-08-01', days=days, seed=1)
+    extra = pd.concat([live.iloc[:1]]*surge, ignore_index=True)
+    extra['Date/Time'] = pd.Timestamp(surge_at)
+    live = pd.concat([live, extra], ignore_index=True).sort_values('Date/Time', kind='stable')
+    write_raw_csv(live, path)
+
+
+def check_gaps():
+    """A surge followed by a long silence raises the surge and a drop for every empty bin."""
+    slots = 96
+    baseline = Baseline(np.full((7, slots), 10.0), np.full((7, slots), 1.0))
+    monitor = DemandMonitor(baseline, BASES, window=8, threshold=3.0)
+    surge = pd.Timestamp('2014-08-04 10:05').to_pydatetime()
+    for _ in range(200):
+        monitor.process(surge, BASES[0])
+    #next pickup 3 hours later: more than the 8-bin ring
+    monitor.process(surge + pd.Timedelta(hours=3).to_pytimedelta(), BASES[0])
+    monitor.flush()
+    kinds = [(alert.bin_start.strftime('%H:%M'), alert.kind, alert.rides) for alert in monitor.alerts]
+    assert kinds[0] == ('10:00', 'surge', 200), kinds
+    assert kinds[1:] == [(stamp.strftime('%H:%M'), 'drop', 0)
+                         for stamp in pd.date_range('2014-08-04 10:15', '2014-08-04 12:45', freq='15min')], kinds
+    print('gap check: surge kept and %d empty bins flagged as drops' % (len(kinds) - 1))
+
+
+def check_out_of_order(bins=24, rides=100, jitter_bins=3, seed=0):
+    """Events reordered by up to ``jitter_bins`` bins are scored with their full bin counts."""
+    slots = 96
+    baseline = Baseline(np.full((7, slots), float(rides)), np.full((7, slots), 1.0))
+    monitor = DemandMonitor(baseline, BASES, window=8, threshold=3.0)
+    start = pd.Timestamp('2014-08-04 06:00')
+    minutes = np.repeat(np.arange(bins)*15, rides) + 7
+    #deliver each event up to jitter_bins bins after its own time
+    delay = np.random.default_rng(seed).uniform(0, jitter_bins*15, len(minutes))
+    for minute in minutes[np.argsort(minutes + delay, kind='stable')]:
+        monitor.process((start + pd.Timedelta(minutes=int(minute))).to_pydatetime(), BASES[0])
+    monitor.flush()
+    assert monitor.late == 0, monitor.late
+    assert not monitor.alerts, list(monitor.alerts)
+    print('out-of-order check: %d bins reordered by up to %d bins, no false alerts' % (bins, jitter_bins))
+
+
+async def replay(monitor, path):
+    stop = asyncio.Event()
+    stop.set()
+    await monitor.consume(tail_file(path, stop=stop))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history', type=int, default=1000000)
+    parser.add_argument('--days', type=int, nargs='+', default=[7, 28])
+    parser.add_argument('--threshold', type=float, default=4.0)
+    args = parser.parse_args()
+
+    check_gaps()
+    check_out_of_order()
+    baseline = Baseline.from_cube(CountCube.from_frame(synthetic_pickups(args.history)))
+    with tempfile.TemporaryDirectory() as tmp:
+        for days in args.days:
+            path = os.path.join(tmp, 'live_%d.csv' % days)
+            live_stream(path, args.history*days // 31, days)
+            monitor = DemandMonitor(baseline, BASES, threshold=args.threshold)
+            before = current_rss()
+            start = time.perf_counter()
+            asyncio.run(replay(monitor, path))
+            elapsed = time.perf_counter() - start
+            grown = (current_rss() - before) / 2**20
+            print('%d events in %.2fs (%.0f/s), RSS +%.1f MB, %d alerts, %d late'
+                  % (monitor.latency.n, elapsed, monitor.latency.n / elapsed, grown, len(monitor.alerts), monitor.late))
+            print('  ' + monitor.latency.summary())
+            for alert in sorted(monitor.alerts, key=lambda a: -abs(a.zscore))[:3]:
+                print('  %s %-5s %d rides vs %.1f expected (z=%.1f)'
+                      % (alert.bin_start, alert.kind, alert.rides, alert.expected, alert.zscore))
+
+
+if __name__ == '__main__':
+    main()
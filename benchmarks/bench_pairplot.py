@@ -0,0 +1,63 @@
+"""Cells 81-82: ``sns.pairplot``/``sns.jointplot`` vs. the histogram-based summary plots.
+
+The modeling frame has one row per (day, slot, base), so its length grows
+with the number of days covered.
+
+    python benchmarks/bench_pairplot.py --days 31 365 1460
+"""
+import argparse
+import io
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+from uber_analysis.cube import CountCube
+from uber_analysis.features import weekend_flag
+from uber_analysis.pairplot import pair_histograms, summary_jointplot, summary_pairplot
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def modeling_frame(days, rides_per_day=26000):
+    cube = CountCube.from_frame(synthetic_pickups(days*rides_per_day, days=days))
+    frame = cube.modeling_frame()
+    frame['Weekend'] = weekend_flag(frame['WeekDay'])
+    return frame
+
+
+def draw(fn):
+    start = time.perf_counter()
+    result = fn()
+    figure = getattr(result, 'figure', None) or getattr(result, 'fig', None) or plt.gcf()
+    figure.savefig(io.BytesIO(), format='png')
+    plt.close('all')
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, nargs='+', default=[31, 365])
+    parser.add_argument('--seaborn-max', type=int, default=20000,
+                        help='skip the seaborn plots above this many frame rows')
+    args = parser.parse_args()
+
+    for days in args.days:
+        df = modeling_frame(days)
+        start = time.perf_counter()
+        pair_histograms(df, hue='Base')
+        t_hist = time.perf_counter() - start
+        t_pair = draw(lambda: summary_pairplot(df, hue='Base'))
+        t_joint = draw(lambda: summary_jointplot(x='Rides', y='Time', data=df, hue='Base'))
+        if len(df) <= args.seaborn_max:
+            sns_pair = '%7.2fs' % draw(lambda: sns.pairplot(df, hue='Base'))
+            sns_joint = '%7.2fs' % draw(lambda: sns.jointplot(x='Rides', y='Time', data=df, hue='Base'))
+        else:
+            sns_pair = sns_joint = 'skipped'
+        print('%4d days (%8d rows): histograms %.3fs | pairplot summary %6.2fs, seaborn %s | '
+              'jointplot summary %5.2fs, seaborn %s' % (days, len(df), t_hist, t_pair, sns_pair, t_joint, sns_joint))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Scaling of the partitioned cube + distance aggregation over worker counts.
+
+    python benchmarks/bench_parallel.py --rows 4000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from uber_analysis.cube import CountCube
+from uber_analysis.distance import LANDMARKS, landmark_distances
+from uber_analysis.parallel import parallel_aggregate
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=4000000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    #April-September, like the production runs
+    data = synthetic_pickups(args.rows, start='2014-04-01', days=183)
+    radii = np.arange(0.1, 5.1, 0.1)
+    print('%d rows, %d CPUs' % (args.rows, os.cpu_count() or 1))
+
+    start = time.perf_counter()
+    CountCube.from_frame(data)
+    landmark_distances(data, LANDMARKS)
+    serial = time.perf_counter() - start
+    print('%-10s %7.2fs' % ('in-process', serial))
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        parallel_aggregate(data, workers, landmarks=LANDMARKS, radii=radii)
+        elapsed = time.perf_counter() - start
+        print('%-10s %7.2fs  speedup %4.2fx' % ('%d workers' % workers, elapsed, serial / elapsed))
+
+
+if __name__ == '__main__':
+    main()
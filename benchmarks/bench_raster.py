@@ -0,0 +1,47 @@
+"""Cell 27's ``sns.scatterplot`` vs. the rasterized density plot.
+
+    python benchmarks/bench_raster.py --rows 100000 1000000 10000000
+"""
+import argparse
+import io
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+from uber_analysis.raster import density_plot
+from uber_analysis.synthetic import synthetic_pickups
+
+
+def draw(fn):
+    start = time.perf_counter()
+    plt.figure(figsize=(12, 12))
+    fn()
+    plt.savefig(io.BytesIO(), format='png')
+    plt.close('all')
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--scatter-max', type=int, default=1000000,
+                        help='skip the seaborn path above this many rows')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        data = synthetic_pickups(rows)
+        t_raster = draw(lambda: density_plot(data['Lat'], data['Lon']))
+        if rows <= args.scatter_max:
+            t_scatter = draw(lambda: sns.scatterplot(x='Lat', y='Lon', data=data, edgecolor='None',
+                                                     alpha=0.5, color='darkblue'))
+            scatter = '%7.2fs' % t_scatter
+        else:
+            scatter = 'skipped'
+        print('%10d points: raster %6.2fs, scatterplot %s' % (rows, t_raster, scatter))
+
+
+if __name__ == '__main__':
+    main()
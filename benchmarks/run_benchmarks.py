@@ -0,0 +1,238 @@
+"""Benchmark suite for every hot cell of the notebook, on synthetic pickups.
+
+Each stage is timed as the notebook does it ("notebook") and with the
+package's replacement ("package"). Row-wise paths that would take hours at
+large sizes are timed on a prefix and extrapolated linearly (marked in the
+output). Every stage is timed best-of-``--repeat`` to damp scheduler noise.
+Results go to JSON; ``--compare`` flags regressions against an earlier
+results file, ignoring differences below ``--min-delta`` seconds.
+
+    python benchmarks/run_benchmarks.py --rows 100000 1000000 10000000 --output bench.json
+    python benchmarks/run_benchmarks.py --rows 100000 --compare bench.json
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from uber_analysis.cube import DayMap
+from uber_analysis.distance import LANDMARKS
+from uber_analysis.synthetic import synthetic_pickups, write_raw_csv
+
+
+#repeats stop early once a stage has used this many seconds in total
+MAX_REPEAT_SECONDS = 30
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def best_of(fn, repeat):
+    """Fastest of up to ``repeat`` timings of ``fn`` (fewer for stages that take long)."""
+    best, total = float('inf'), 0.0
+    for _ in range(max(repeat, 1)):
+        seconds, _ = timed(fn)
+        best = min(best, seconds)
+        total += seconds
+        if total > MAX_REPEAT_SECONDS:
+            break
+    return best
+
+
+def notebook_frame(frame):
+    """``uber_data`` as it looks after cell 30 (not timed)."""
+    from uber_analysis.distance import landmark_distances
+
+    uber_data = frame.copy()
+    uber_data['Base'] = uber_data['Base'].astype(str)
+    uber_data['BinnedHour'] = uber_data['Date/Time'].dt.floor('15min')
+    uber_data['Day'] = pd.Categorical(uber_data['BinnedHour'].dt.weekday.map(DayMap),
+                                      categories=list(DayMap.values()), ordered=True)
+    uber_data['Date'] = uber_data['BinnedHour'].dt.date
+    uber_data['Time'] = uber_data['BinnedHour'].dt.time
+    uber_data[['Distance MM', 'Distance ESB']] = landmark_distances(uber_data, LANDMARKS)
+    return uber_data
+
+
+def notebook_stages(csv_path, frame, rowwise_max):
+    from scipy.stats import ttest_ind
+    from uber_analysis.distance import haversine
+
+    def parse():
+        uber_data = pd.read_csv(csv_path)
+        uber_data['Date/Time'] = pd.to_datetime(uber_data['Date/Time'])
+        return uber_data
+
+    yield 'csv_parse', parse, len(frame)
+    yield 'floor_15min', lambda: frame['Date/Time'].dt.floor('15min'), len(frame)
+
+    uber_data = notebook_frame(frame)
+    head = uber_data.iloc[:rowwise_max]
+    yield 'haversine', lambda: [head[['Lat', 'Lon']].apply(lambda x: haversine(c, tuple(x)), axis=1)
+                                for c in LANDMARKS.values()], len(head)
+
+    distance_range = np.arange(0.1, 5.1, 0.1)
+    yield 'threshold_sweep', lambda: [(uber_data[['Distance MM', 'Distance ESB']] < d).sum()
+                                      for d in distance_range], len(uber_data)
+
+    def groupby_counts():
+        uber_data.groupby(['Date', 'Day', 'Time'], observed=True).count()
+        uber_data.groupby(['Date', 'Time']).count()
+        uber_data.groupby(['Date']).count()
+        uber_data.groupby(['Date']).count()
+        df = uber_data[['Date/Time', 'Base']].assign(
+            WeekDay=uber_data['Date/Time'].dt.weekday, Day=uber_data['Date/Time'].dt.day,
+            Time=uber_data['Date/Time'].dt.hour + uber_data['Date/Time'].dt.minute // 15 / 4, DropMe=1)
+        return df.groupby(['Day', 'WeekDay', 'Time', 'Base']).count()
+    yield 'groupby_counts', groupby_counts, len(uber_data)
+
+    def ttest():
+        for_ttest = uber_data.groupby(['Date', 'Time']).count()['Day'].reset_index(level=1)
+        for_ttest = pd.concat([for_ttest['Day'] / uber_data.groupby(['Date']).count()['Day'], for_ttest['Time']], axis=1)
+        for_ttest = for_ttest.rename(columns={'Day': 'NormalizedRides'})
+        for_ttest['Day'] = pd.to_datetime(pd.Series(for_ttest.index, index=for_ttest.index)).dt.day_name()
+        return for_ttest.groupby('Time').apply(
+            lambda x: ttest_ind(x[x['Day'] < 'Saturday']['NormalizedRides'], x[x['Day'] >= 'Saturday']['NormalizedRides']))
+    yield 'ttest', ttest, len(uber_data)
+
+    def heatmap_prep():
+        points = uber_data[['Lat', 'Lon']].to_numpy().tolist()
+        first_week = uber_data[uber_data['BinnedHour'] < datetime.datetime(2014, 7, 8)].copy()
+        first_week['Weight'] = 0.1
+        frames = first_week.groupby('BinnedHour').apply(
+            lambda x: x[['Lat', 'Lon', 'Weight']].sample(int(len(x)/3)).to_numpy().tolist())
+        return points, frames
+    yield 'heatmap_prep', heatmap_prep, len(uber_data)
+
+
+def package_stages(csv_path, frame, cache_dir):
+    from uber_analysis.cube import CountCube
+    from uber_analysis.distance import landmark_distances
+    from uber_analysis.heatmaps import heatmap_frames, heatmap_points
+    from uber_analysis.ingest import load_pickups
+    from uber_analysis.proximity import LandmarkIndex
+    from uber_analysis.stats import weekday_weekend_ttest
+
+    #every cold parse writes to a fresh cache directory, so repeats stay cold
+    cold = itertools.count()
+    yield 'csv_parse', lambda: load_pickups(csv_path, cache_dir=os.path.join(cache_dir, 'cold%d' % next(cold))), \
+        len(frame)
+    load_pickups(csv_path, cache_dir=cache_dir)
+    yield 'csv_parse_warm', lambda: load_pickups(csv_path, cache_dir=cache_dir), len(frame)
+    yield 'floor_15min', lambda: frame['Date/Time'].dt.floor('15min'), len(frame)
+    yield 'haversine', lambda: landmark_distances(frame, LANDMARKS), len(frame)
+
+    distances = landmark_distances(frame, LANDMARKS)
+    radii = np.arange(0.1, 5.1, 0.1)
+
+    def sweep():
+        index = LandmarkIndex(frame['Lat'].to_numpy(), frame['Lon'].to_numpy())
+        for name, coords in LANDMARKS.items():
+            index.add_landmark(name, coords, distances=distances['Distance ' + name])
+        return index.count_within(radii)
+    yield 'threshold_sweep', sweep, len(frame)
+
+    def groupby_counts():
+        cube = CountCube.from_frame(frame)
+        return cube.weekly_data(), cube.normalized_rides(), cube.daily_totals(), cube.modeling_frame()
+    yield 'groupby_counts', groupby_counts, len(frame)
+
+    yield 'ttest', lambda: weekday_weekend_ttest(CountCube.from_frame(frame)), len(frame)
+
+    def heatmap_prep():
+        binned = frame['Date/Time'].dt.floor('15min')
+        return heatmap_points(frame['Lat'], frame['Lon']), heatmap_frames(frame, times=binned)
+    yield 'heatmap_prep', heatmap_prep, len(frame)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(sizes, rowwise_max, seed=0, log=print, repeat=3):
+    results = []
+    for rows in sizes:
+        workdir = tempfile.mkdtemp()
+        try:
+            frame = synthetic_pickups(rows, seed=seed)
+            csv_path = os.path.join(workdir, 'uber-raw-data-jul14.csv')
+            write_raw_csv(frame, csv_path)
+            suites = [('notebook', notebook_stages(csv_path, frame, rowwise_max)),
+                      ('package', package_stages(csv_path, frame, os.path.join(workdir, 'cache')))]
+            for impl, stages in suites:
+                for stage, fn, timed_rows in stages:
+                    seconds = best_of(fn, repeat)
+                    extrapolated = timed_rows < rows
+                    if extrapolated:
+                        seconds *= rows / timed_rows
+                    results.append({'stage': stage, 'impl': impl, 'rows': rows, 'seconds': round(seconds, 4),
+                                    'extrapolated': extrapolated})
+                    log('%9d %-9s %-16s %9.3fs%s' % (rows, impl, stage, seconds, ' (extrapolated)' if extrapolated else ''))
+        finally:
+            shutil.rmtree(workdir)
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta=0.005):
+    """Entries that got slower than ``baseline`` by more than ``tolerance`` (a fraction) and ``min_delta`` seconds."""
+    previous = {(r['stage'], r['impl'], r['rows']): r['seconds'] for r in baseline['results']}
+    slower = []
+    for r in results:
+        before = previous.get((r['stage'], r['impl'], r['rows']))
+        if before and r['seconds'] > before*(1 + tolerance) and r['seconds'] - before > min_delta:
+            slower.append(dict(r, baseline=before))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 10000000])
+    parser.add_argument('--rowwise-max', type=int, default=100000,
+                        help='rows timed on row-wise paths before extrapolating')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='write results to this JSON file')
+    parser.add_argument('--compare', default=None, help='earlier results JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before flagging')
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help='slowdowns below this many seconds are never flagged')
+    parser.add_argument('--repeat', type=int, default=3, help='time every stage best-of this many runs')
+    args = parser.parse_args()
+
+    results = run_suite(args.rows, args.rowwise_max, args.seed, repeat=args.repeat)
+    report = {
+        'meta': {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+                 'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                 'cpus': os.cpu_count(), 'repeat': args.repeat},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(results, json.load(f), args.tolerance, args.min_delta)
+        for r in slower:
+            print('REGRESSION %(impl)s/%(stage)s at %(rows)d rows: %(baseline).3fs -> %(seconds).3fs' % r)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
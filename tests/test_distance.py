@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from uber_analysis.distance import LANDMARKS, haversine, haversine_matrix, landmark_distances
+from uber_analysis.synthetic import synthetic_pickups
+
+
+@pytest.fixture(scope='module')
+def pickups():
+    return synthetic_pickups(2000, seed=3)
+
+
+def test_landmark_distances_match_rowwise_haversine(pickups):
+    #cell 30
+    expected = pd.DataFrame({'Distance ' + name: pickups[['Lat', 'Lon']].apply(lambda x: haversine(coords, tuple(x)),
+                                                                              axis=1)
+                             for name, coords in LANDMARKS.items()})
+    got = landmark_distances(pickups)
+    assert list(got.columns) == list(expected.columns)
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=0, atol=1e-9)
+
+
+def test_chunked_matrix_into_float32(pickups):
+    out = np.empty((len(pickups), len(LANDMARKS)), dtype=np.float32)
+    haversine_matrix(pickups['Lat'], pickups['Lon'], list(LANDMARKS.values()), chunk_size=97, out=out)
+    np.testing.assert_allclose(out, landmark_distances(pickups).to_numpy(), rtol=1e-6)
+
+
+def test_list_of_landmarks_named_by_position(pickups):
+    got = landmark_distances(pickups, list(LANDMARKS.values()))
+    assert list(got.columns) == ['Distance 0', 'Distance 1']
+    np.testing.assert_array_equal(got.to_numpy(), landmark_distances(pickups).to_numpy())
+
+
+def test_bad_landmarks():
+    with pytest.raises(ValueError):
+        haversine_matrix([40.7], [-73.9], [(1, 2, 3)])
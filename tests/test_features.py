@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from uber_analysis.features import quarter_hour_time, time_features, weekend_flag
+
+
+def func(x):
+    #cell 73
+    hr = float(x.hour)
+    minute = int(x.minute/15)
+    return hr + minute/4
+
+
+def random_stamps(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(pd.Timestamp('2014-07-01') + pd.to_timedelta(rng.integers(0, 31*86400, rows), unit='s'))
+
+
+def test_time_features_match_rowwise_cells():
+    stamps = random_stamps(20000, seed=1)
+    expected = pd.DataFrame({'Date/Time': stamps})
+    expected['WeekDay'] = expected['Date/Time'].dt.weekday
+    expected['Time'] = expected['Date/Time'].apply(func)
+    expected['Day'] = expected['Date/Time'].dt.day
+    #cell 80
+    expected['Weekend'] = expected.apply(lambda x: 1 if(x['WeekDay'] > 4) else 0, axis=1)
+
+    got = time_features(stamps)
+    for column in ['Time', 'WeekDay', 'Day', 'Weekend']:
+        np.testing.assert_array_equal(got[column].to_numpy(), expected[column].to_numpy(), err_msg=column)
+
+
+def test_quarter_hour_time_examples():
+    stamps = pd.Series(pd.to_datetime(['2014-07-01 01:15:00', '2014-07-01 12:59:59', '2014-07-01 00:14:00']))
+    assert quarter_hour_time(stamps).tolist() == [1.25, 12.75, 0.0]
+
+
+def test_weekend_flag():
+    assert weekend_flag(range(7)).tolist() == [0, 0, 0, 0, 0, 1, 1]
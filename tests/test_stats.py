@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ttest_ind
+
+from uber_analysis.cube import CountCube
+from uber_analysis.stats import batched_ttest, normalized_matrix, weekday_weekend_ttest
+from uber_analysis.synthetic import synthetic_pickups
+
+
+@pytest.mark.parametrize('equal_var', [True, False])
+def test_batched_ttest_matches_scipy(equal_var):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(31, 40))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    group = rng.random(31) < 0.7
+    statistic, pvalue = batched_ttest(values, group, equal_var=equal_var)
+    for j in range(values.shape[1]):
+        a, b = values[group, j], values[~group, j]
+        expected = ttest_ind(a[~np.isnan(a)], b[~np.isnan(b)], equal_var=equal_var)
+        assert statistic[j] == pytest.approx(expected.statistic, rel=1e-10)
+        assert pvalue[j] == pytest.approx(expected.pvalue, rel=1e-8)
+
+
+def test_weekday_weekend_ttest_matches_per_slot_loop():
+    cube = CountCube.from_frame(synthetic_pickups(50000, seed=2))
+    got = weekday_weekend_ttest(cube)
+    normalized = pd.DataFrame(normalized_matrix(cube))
+    weekday = cube.weekdays < 5
+    #cell 64: one ttest_ind per slot
+    for slot in range(normalized.shape[1]):
+        column = normalized[slot]
+        expected = ttest_ind(column[weekday].dropna(), column[~weekday].dropna())
+        assert got['statistic'].iloc[slot] == pytest.approx(expected.statistic, rel=1e-10)
+        assert got['pvalue'].iloc[slot] == pytest.approx(expected.pvalue, rel=1e-8)
+
+
+def test_batched_ttest_shape_check():
+    with pytest.raises(ValueError):
+        batched_ttest(np.zeros((3, 2)), [True, False])
@@ -39,9 +39,18 @@ import seaborn as sns
 import geopy.distance
 from math import radians,cos,sin,asin,sqrt
 import folium
-import datetime
 from folium.plugins import HeatMap
-from scipy.stats import ttest_ind
+from uber_analysis.cube import CountCube
+from uber_analysis.distance import landmark_distances
+from uber_analysis.features import weekend_flag
+from uber_analysis.heatmaps import heatmap_frames, heatmap_points
+from uber_analysis.ingest import load_pickups
+from uber_analysis.kde import histkde_plot
+from uber_analysis.pairplot import summary_jointplot, summary_pairplot
+from uber_analysis.proximity import LandmarkIndex
+from uber_analysis.raster import density_plot
+from uber_analysis.schema import column, compact_pickups, memory_report
+from uber_analysis.stats import weekday_weekend_ttest
 
 matplotlib.rcParams.update({'font.size': 12})
 
@@ -51,7 +60,8 @@ matplotlib.rcParams.update({'font.size': 12})
 # In[3]:
 
 
-uber_data = pd.read_csv('uber-raw-data-jul14.csv')
+#parses Date/Time with an explicit format and caches the result, later runs memory-map the cache
+uber_data = load_pickups('uber-raw-data-jul14.csv',verbose=True)
 
 
 # In[4]:
@@ -71,7 +81,8 @@ type(uber_data.loc[0,'Date/Time'])
 # In[6]:
 
 
-uber_data['Date/Time'] = pd.to_datetime(uber_data['Date/Time'])
+#Date/Time is already parsed by load_pickups (explicit format, no inference)
+uber_data.dtypes
 
 
 # **Let us divide each hour in existing Date/Time column into four smaller bins of 15 mins each:**
@@ -178,7 +189,9 @@ uber_data['Time']=uber_data['BinnedHour'].dt.time
 # In[17]:
 
 
-weekly_data = uber_data.groupby(['Date','Day','Time']).count().dropna().rename(columns={'BinnedHour':'Rides'})['Rides'].reset_index()
+#count the rides once per (date, 15-min slot, base); the grouped views below are cheap reductions of this cube
+cube = CountCube.from_frame(uber_data)
+weekly_data = cube.weekly_data()
 weekly_data.head(10)
 
 
@@ -188,7 +201,7 @@ weekly_data.head(10)
 
 
 #Grouping the weekly_data daywise
-daywise = weekly_data.groupby('Day').sum()
+daywise = cube.daywise()
 daywise
 
 
@@ -292,11 +305,11 @@ _=plt.title('CountPlot: Total uber rides vs Base - July 2014, NYC')
 
 
 plt.figure(figsize=(10,10))
-sns.histplot(uber_data['Lat'], bins='auto',kde=True,color='r',alpha=0.4,label = 'latitude')
+histkde_plot(uber_data['Lat'], bins='auto',color='r',alpha=0.4,label = 'latitude')
 plt.legend(loc='upper right')
 plt.xlabel('Latitude')
 plt.twiny()
-sns.histplot(uber_data['Lon'], bins='auto',kde=True,color='g',alpha=0.4,label = 'longitude')
+histkde_plot(uber_data['Lon'], bins='auto',color='g',alpha=0.4,label = 'longitude')
 _=plt.legend(loc='upper left')
 _=plt.xlabel('Longitude')
 _=plt.title('Distribution of Latitude and Longitude')
@@ -310,7 +323,8 @@ _=plt.title('Distribution of Latitude and Longitude')
 
 
 plt.figure(figsize=(12,12))
-sns.scatterplot(x='Lat',y='Lon',data=uber_data,edgecolor='None',alpha=0.5,color='darkblue')
+#pickups are counted per pixel and drawn as one image (log colour scale) instead of one marker per point
+density_plot(uber_data['Lat'],uber_data['Lon'],cmap='Blues')
 plt.xlabel('Latitude')
 plt.ylabel('Longitude')
 _=plt.title('Latitude - Longitude Scatter Plot')
@@ -363,8 +377,8 @@ print("Distance (mi) = ",haversine(metro_art_coordinates,empire_state_building_c
 
 
 #calculating distance to MM and ESB for each point in the dataset
-uber_data['Distance MM'] = uber_data[['Lat','Lon']].apply(lambda x: haversine(metro_art_coordinates,tuple(x)),axis=1)
-uber_data['Distance ESB'] = uber_data[['Lat','Lon']].apply(lambda x: haversine(empire_state_building_coordinates,tuple(x)),axis=1)
+#(vectorized over the whole Lat/Lon columns, same values as the row-wise haversine above)
+uber_data[['Distance MM','Distance ESB']] = landmark_distances(uber_data,{'MM':metro_art_coordinates,'ESB':empire_state_building_coordinates})
 
 
 # In[31]:
@@ -374,6 +388,16 @@ uber_data['Distance ESB'] = uber_data[['Lat','Lon']].apply(lambda x: haversine(e
 uber_data.head(10)
 
 
+# In[ ]:
+
+
+#From here on keep uber_data in the compact schema: categorical Base/Day, integer date and slot codes,
+#float32 coordinates and distances. BinnedHour, Date and Time are rebuilt on demand with column().
+uber_compact = compact_pickups(uber_data)
+print(memory_report(uber_data, uber_compact))
+uber_data = uber_compact
+
+
 # In[32]:
 
 
@@ -395,7 +419,11 @@ distance_range = np.arange(0.1,5.1,0.1)
 # In[34]:
 
 
-distance_data = [(uber_data[['Distance MM','Distance ESB']] < dist).sum() for dist in distance_range]
+#sort each distance column once, then count every threshold with a single searchsorted
+landmark_index = LandmarkIndex(uber_data['Lat'],uber_data['Lon'])
+landmark_index.add_landmark('Distance MM',metro_art_coordinates,distances=uber_data['Distance MM'])
+landmark_index.add_landmark('Distance ESB',empire_state_building_coordinates,distances=uber_data['Distance ESB'])
+distance_data = landmark_index.count_within(distance_range)
 
 
 # In[35]:
@@ -407,9 +435,7 @@ distance_data
 # In[36]:
 
 
-#concatentate and transpose
-distance_data = pd.concat(distance_data,axis=1)
-distance_data = distance_data.T
+#count_within already returns one row per threshold and one column per landmark
 
 
 # In[37]:
@@ -447,8 +473,8 @@ uber_map = folium.Map(location=metro_art_coordinates,zoom_start=10)
 #lets mark MM and ESB on the map
 folium.Marker(metro_art_coordinates,popup = "MM").add_to(uber_map)
 folium.Marker(empire_state_building_coordinates,popup = "ESB").add_to(uber_map)
-#convert to numpy array and plot it
-Lat_Lon = uber_data[['Lat','Lon']].to_numpy()
+#aggregate the pickups into weighted grid cells (instead of sending every point to the browser) and plot them
+Lat_Lon = heatmap_points(uber_data['Lat'],uber_data['Lon'])
 folium.plugins.HeatMap(Lat_Lon,radius=10).add_to(uber_map)
 #Displaying the map
 uber_map
@@ -459,9 +485,9 @@ uber_map
 # In[41]:
 
 
-uber_data['Weight']=0.5
-#Take on 10000 points to plot (Just to speed up things)
-Lat_Lon = uber_data[['Lat','Lon','Weight']].to_numpy()
+#(the weight is applied to the grid cells, there is no need for a constant Weight column in uber_data)
+#Grid cells weighted by ride count, scaled so that the busiest cell has a weight of 0.5
+Lat_Lon = heatmap_points(uber_data['Lat'],uber_data['Lon'],intensity=0.5)
 #Plotting
 uber_map = folium.Map(metro_art_coordinates,zoom_start=10)
 folium.plugins.HeatMap(Lat_Lon,radius=15).add_to(uber_map)
@@ -495,17 +521,10 @@ i[i==True]
 # In[44]:
 
 
-#Create a copy of the data
-map_data = uber_data[i].copy()
-
-#use a smaller weight
-map_data['Weight'] = 0.1
-
-#Restricting data to that before 8th july for faster calculations
-map_data = uber_data[uber_data["BinnedHour"] < datetime.datetime(2014,7,8)].copy()
-
-#Generate samples for each timestamp in "BinnedHour" (these are the points that are plotted for each timestamp)
-map_data = map_data.groupby("BinnedHour").apply(lambda x: x[['Lat','Lon','Weight']].sample(int(len(x)/3)).to_numpy().tolist())
+#Select only the rows inside the radius and only the columns the heatmap needs (no full copy of uber_data).
+#Snap the points of each "BinnedHour" timestamp to a lat/lon grid and keep only the non-empty cells,
+#weighted by their ride count. This is small enough to cover the whole month.
+map_data = heatmap_frames(uber_data.loc[i,['Lat','Lon']],times=column(uber_data,'BinnedHour')[i])
 
 
 # In[45]:
@@ -518,10 +537,10 @@ map_data
 
 
 #The index to be passed on to heatmapwithtime needs to be a time series of the following format
-data_hour_index = [x.strftime("%m%d%Y, %H:%M:%S") for x in map_data.index]
+data_hour_index = map_data.index
 
-#convert to list to feed it to heatmapwithtime
-date_hour_data = map_data.tolist()
+#one list of [lat,lon,weight] cells per timestamp
+date_hour_data = map_data.data
 
 #initialize map
 uber_map = folium.Map(location=metro_art_coordinates,zoom_start=10)
@@ -531,7 +550,7 @@ uber_map = folium.Map(location=metro_art_coordinates,zoom_start=10)
 
 
 #plotting
-hm = folium.plugins.HeatMapWithTime(date_hour_data,index=date_hour_data)
+hm = folium.plugins.HeatMapWithTime(date_hour_data,index=data_hour_index)
 
 #add heatmap to folium map(uber_map)
 hm.add_to(uber_map)
@@ -614,21 +633,22 @@ _=plt.title('Time Averaged Rides (Normalized) - Weekend, Weekdays')
 
 
 #Grouping by date and time and creating a dataset that gives the total rides every 15 mins
-for_ttest = uber_data.groupby(['Date','Time']).count()['Day'].reset_index(level=1)
+#(rides per slot divided by the day's total rides, read from the count cube)
+for_ttest = cube.normalized_rides()
 
 
 # In[57]:
 
 
 #Total rides on each day in july
-uber_data.groupby(['Date']).count()['Day']
+cube.daily_totals()
 
 
 # In[58]:
 
 
 #Normalizing the dataset by dividing rides in each time slot on a day by total number of rides on that day
-for_ttest = pd.concat([for_ttest['Day']/uber_data.groupby(['Date']).count()['Day'],for_ttest['Time']],axis=1)
+#(already normalized by cube.normalized_rides above)
 
 
 # In[59]:
@@ -673,13 +693,14 @@ for_ttest
 # In[64]:
 
 
-ttestvals = for_ttest.groupby('Time').apply(lambda x: ttest_ind(x[x['Day']<'Saturday']['NormalizedRides'],x[x['Day']>='Saturday']['NormalizedRides']))
+#all 96 slots at once on a (days x slots) matrix; weekdays are Mon-Fri by weekday number
+ttestvals = weekday_weekend_ttest(cube)
 
 
 # In[65]:
 
 
-ttestvals=pd.DataFrame(ttestvals.to_list(),index = ttestvals.index)
+#(already a frame with statistic and pvalue columns, indexed by Time)
 
 
 # In[66]:
@@ -756,63 +777,12 @@ _=plt.ylabel('P_value')
 uber_data
 
 
-# In[71]:
-
-
-#create a copy
-df = uber_data.copy()
-
-
-# In[72]:
-
-
-#get numbers of each weekday
-df['WeekDay']=df['Date/Time'].dt.weekday
-
-
-# In[73]:
-
-
-#Convert datetime to float. egs: 1:15AM will be 1.25, 12:45 will be 12.75 etc
-def func(x):
-    hr = float(x.hour)
-    minute = int(x.minute/15)
-    return hr + minute/4
-df['Time']=df['Date/Time'].apply(func)
-
-
-# In[74]:
-
-
-#Get the day number, removing month and year
-df['Day']=df['Date/Time'].dt.day
-
-
-# In[75]:
-
-
-df
-
-
-# In[76]:
-
-
-#Remove unwanted columns that were created for visualization
-df = df.drop(['Date/Time','BinnedHour','Date','Distance MM','Distance ESB','Lat','Lon'],axis=1)
-
-
-# In[77]:
-
-
-#create a redundant columns for easy counting of tolal rides
-df['DropMe']=1
-
-
 # In[78]:
 
 
 #count the number of rides for a given day, weekday number, time and base
-df = df.groupby(['Day','WeekDay','Time','Base']).count()['DropMe'].reset_index().rename(columns={'DropMe':'Rides'})
+#(Day, WeekDay and the quarter-hour Time come straight from the count cube's axes)
+df = cube.modeling_frame()
 
 
 # In[79]:
@@ -826,7 +796,7 @@ df
 
 #Weekends are given special emphasis, as their trends were very different from that on weekdays.
 #so we devote a special columns indicating whether the day is weekday or not
-df['Weekend']=df.apply(lambda x: 1 if(x['WeekDay']>4) else 0,axis=1)
+df['Weekend']=weekend_flag(df['WeekDay'])
 
 
 # **Let's visualize a pairplot**
@@ -834,7 +804,7 @@ df['Weekend']=df.apply(lambda x: 1 if(x['WeekDay']>4) else 0,axis=1)
 # In[81]:
 
 
-sns.pairplot(df,hue='Base')
+summary_pairplot(df,hue='Base')
 
 
 # **Notice the clusters in data! Especially time-rides, day-rides.**
@@ -845,7 +815,7 @@ sns.pairplot(df,hue='Base')
 
 
 plt.figure()
-_=sns.jointplot(x='Rides',y='Time',data = df,hue='Base')
+_=summary_jointplot(x='Rides',y='Time',data = df,hue='Base')
 
 
 # In[ ]:
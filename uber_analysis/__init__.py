@@ -0,0 +1,3 @@
+"""Helpers for the Uber pickups in NYC (2014) analysis notebook."""
+
+__version__ = '0.1.0'
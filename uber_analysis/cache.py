@@ -0,0 +1,130 @@
+"""Content-addressed on-disk cache for pipeline stage outputs.
+
+A stage's key is a hash of the input file's hash, the stage's own parameters,
+the keys of the stages it depends on and a code version, so a change anywhere
+upstream changes every downstream key. Entries are pickles; the least
+recently used ones are evicted once the cache grows past ``max_bytes``, and
+an entry that fails to load for any reason is dropped and treated as a miss.
+"""
+import hashlib
+import json
+import os
+import pickle
+from functools import lru_cache
+
+DEFAULT_MAX_BYTES = 512 << 20
+
+
+def _jsonable(value):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return repr(value)
+
+
+@lru_cache(maxsize=None)
+def code_fingerprint(package_dir):
+    """Hash of every ``.py`` file under ``package_dir``, used as the code part of the stage keys."""
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(package_dir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, package_dir).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def stage_key(name, input_hash, params, upstream=(), version=''):
+    """Hex digest identifying one stage's output."""
+    payload = json.dumps({'stage': name, 'input': input_hash, 'params': params,
+                          'upstream': list(upstream), 'version': version},
+                         sort_keys=True, default=_jsonable)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class StageCache:
+    """Size-bounded LRU directory of pickled stage outputs."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """Cached outputs for ``key``, or None on a miss.
+
+        Any entry that cannot be loaded (truncated, written by an incompatible
+        library version, ...) is deleted and counted as a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            self.misses += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        #bump the access time used for LRU ordering
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.evict(keep=key)
+
+    def entries(self):
+        """``(mtime, size, path)`` of every entry, least recently used first."""
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                path = os.path.join(self.directory, name)
+                info = os.stat(path)
+                found.append((info.st_mtime, info.st_size, path))
+        return sorted(found)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == self._path(keep):
+                continue
+            os.remove(path)
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+    def report(self):
+        return ('stage cache: %d hits, %d misses, %d evictions, %.1f MB in %s'
+                % (self.hits, self.misses, self.evictions, self.size() / 2**20, self.directory))
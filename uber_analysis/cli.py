@@ -0,0 +1,187 @@
+"""Command line entry point: ``uber-analysis run --input ... --stages ...``."""
+import argparse
+import os
+import sys
+import time
+
+from . import pipeline
+
+
+def _stage_list(value):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    if names == ['all']:
+        return list(pipeline.STAGES)
+    return names
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='uber-analysis', description='Uber pickups analysis pipeline')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run pipeline stages on a raw pickup CSV')
+    run.add_argument('--input', required=True, help='raw uber-raw-data-*.csv file')
+    run.add_argument('--stages', type=_stage_list, default=None,
+                     help="comma separated stages, or 'all' (default: every non-plot stage)")
+    run.add_argument('--output', default=None, help='directory for result CSVs, figures and maps')
+    run.add_argument('--cache-dir', default='.uber_cache', help='columnar ingest cache directory')
+    run.add_argument('--no-cache', dest='cache_dir', action='store_const', const=None,
+                     help='recompute everything, without reading or writing any cache')
+    run.add_argument('--cache-size-mb', type=float, default=512,
+                     help='size limit of the stage result cache (least recently used entries are evicted)')
+    run.add_argument('--headless', action='store_true', help='skip plot and map stages')
+    run.add_argument('--report', '--memory-report', dest='report', action='store_true',
+                     help='print wall/CPU time, peak RSS and rows of every stage')
+    run.add_argument('--profile', choices=['cprofile', 'sample'], default=None,
+                     help='profile the stages and dump the slowest one (.prof or folded stacks)')
+    run.add_argument('--profile-dir', default=None, help='where to write the profile (default: --output or .)')
+    run.add_argument('--workers', type=int, default=1,
+                     help='processes for the partitioned cube and distance stages')
+    run.add_argument('--landmarks', default=None,
+                     help='CSV of venues (name,lat,lon) for the proximity stage (default: MM and ESB)')
+    run.add_argument('--slot-minutes', type=int, default=pipeline.DEFAULT_PARAMS['slot_minutes'])
+    run.add_argument('--cell-deg', type=float, default=pipeline.DEFAULT_PARAMS['cell_deg'])
+    run.add_argument('--geocell-bits', type=int, default=pipeline.DEFAULT_PARAMS['geocell_bits'],
+                     help='geohash cell precision in bits (5 bits per geohash character)')
+    run.add_argument('--forecast-model', choices=['ridge', 'hgb'], default=pipeline.DEFAULT_PARAMS['forecast_model'])
+    run.add_argument('--holdout-days', type=int, default=pipeline.DEFAULT_PARAMS['holdout_days'],
+                     help='days backtested with nightly refits by the forecast stage')
+    run.add_argument('--hotspot-eps', type=float, default=pipeline.DEFAULT_PARAMS['hotspot_eps_miles'],
+                     help='hotspot neighbourhood radius in miles')
+    run.add_argument('--hotspot-min-samples', type=int, default=pipeline.DEFAULT_PARAMS['hotspot_min_samples'],
+                     help='pickups within the radius that make a hotspot core')
+
+    append = commands.add_parser('append', help='fold new CSV drops into persisted running aggregates')
+    append.add_argument('--state', required=True, help='aggregate state file (.npz), created if missing')
+    append.add_argument('--input', required=True, nargs='+', help='new raw CSV file(s)')
+    append.add_argument('--output', default=None, help='directory for the regenerated output CSVs')
+
+    monitor = commands.add_parser('monitor', help='flag 15-minute demand anomalies on a live pickup stream')
+    monitor.add_argument('--baseline', required=True,
+                         help='baseline file (.npz) or raw history CSV to build it from')
+    monitor.add_argument('--save-baseline', default=None, help='write the baseline built from a CSV here')
+    source = monitor.add_mutually_exclusive_group(required=True)
+    source.add_argument('--tail', default=None, help='CSV file to follow as lines are appended')
+    source.add_argument('--port', type=int, default=None, help='listen for CSV lines on this local TCP port')
+    monitor.add_argument('--window', type=int, default=8, help='bins kept in the ring buffer')
+    monitor.add_argument('--threshold', type=float, default=3.0, help='alert beyond this many standard deviations')
+
+    commands.add_parser('stages', help='list the available stages')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'stages':
+        for current in pipeline.STAGES.values():
+            requires = ', '.join(current.requires) or '-'
+            print('%-10s requires: %-22s%s' % (current.name, requires, ' (plot)' if current.plot else ''))
+        return 0
+
+    if args.command == 'append':
+        return append(args)
+
+    if args.command == 'monitor':
+        return monitor(args)
+
+    plots_requested = args.stages and any(pipeline.STAGES[n].plot for n in args.stages if n in pipeline.STAGES)
+    if plots_requested and not args.headless and args.output is None:
+        print('plot stages need --output (or pass --headless)', file=sys.stderr)
+        return 2
+
+    if not os.path.isfile(args.input):
+        print('error: input file %s does not exist' % args.input, file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    stage_cache = None
+    if args.cache_dir is not None:
+        from .cache import StageCache
+        stage_cache = StageCache(os.path.join(args.cache_dir, 'stages'), int(args.cache_size_mb*2**20))
+    run = pipeline.Run(args.input, output_dir=args.output, headless=args.headless, cache_dir=args.cache_dir,
+                       params={'slot_minutes': args.slot_minutes, 'cell_deg': args.cell_deg,
+                               'geocell_bits': args.geocell_bits, 'forecast_model': args.forecast_model,
+                               'holdout_days': args.holdout_days, 'hotspot_eps_miles': args.hotspot_eps,
+                               'hotspot_min_samples': args.hotspot_min_samples},
+                       stage_cache=stage_cache, workers=args.workers)
+    run.profiler = args.profile
+    try:
+        if args.landmarks is not None:
+            from .landmarks import read_landmarks
+            table = read_landmarks(args.landmarks)
+            run.params['landmark_table'] = {row.name: (row.lat, row.lon) for row in table.itertuples(index=False)}
+        pipeline.run_pipeline(run, args.stages)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    except (OSError, ValueError, ImportError) as e:
+        print('error: %s' % e, file=sys.stderr)
+        return 1
+    if args.report:
+        from .profiling import stage_table
+        print(stage_table(run.records))
+    if args.profile:
+        from .profiling import slowest, write_profile
+        record = slowest(run.records)
+        if record is not None:
+            path = write_profile(record, args.profile_dir or args.output or '.')
+            print('profile of the slowest stage (%s, %.2fs) written to %s' % (record.name, record.wall, path))
+    print('finished in %.2fs' % (time.perf_counter() - start))
+    return 0
+
+
+def append(args):
+    from .incremental import RunningAggregates
+
+    start = time.perf_counter()
+    if os.path.exists(args.state):
+        agg = RunningAggregates.load(args.state)
+    else:
+        agg = RunningAggregates()
+    for path in args.input:
+        touched = agg.append_file(path)
+        if len(touched):
+            print('%s: %d dates updated (%s to %s)' % (path, len(touched), touched[0].date(), touched[-1].date()))
+            if args.output is not None:
+                agg.write_outputs(args.output, touched)
+        else:
+            print('%s: already ingested, skipped' % path)
+    agg.save(args.state)
+    print('finished in %.2fs' % (time.perf_counter() - start))
+    return 0
+
+
+def monitor(args):
+    import asyncio
+
+    from .monitor import Baseline, DemandMonitor, serve_socket, tail_file
+
+    if args.baseline.endswith('.npz'):
+        baseline = Baseline.load(args.baseline)
+    else:
+        from .cube import CountCube
+        from .ingest import read_pickups
+
+        baseline = Baseline.from_cube(CountCube.from_frame(read_pickups(args.baseline)))
+        if args.save_baseline is not None:
+            baseline.save(args.save_baseline)
+
+    def report(alert):
+        print('%s %-5s %d rides vs %.1f expected (z=%+.1f)'
+              % (alert.bin_start, alert.kind, alert.rides, alert.expected, alert.zscore), flush=True)
+
+    from .streaming import BaseMapper
+
+    live = DemandMonitor(baseline, list(BaseMapper), window=args.window, threshold=args.threshold, on_alert=report)
+    try:
+        if args.tail is not None:
+            asyncio.run(live.consume(tail_file(args.tail, from_start=False)))
+        else:
+            asyncio.run(serve_socket(live, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    print(live.latency.summary())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Single-pass (date x 15-min slot x base) ride count cube.
+
+The notebook re-groups the raw frame in cells 17, 56, 57 and 78, each time
+counting every column. ``CountCube`` computes integer codes once, counts rows
+with one ``np.bincount`` and serves those views as slices/reductions of the
+resulting array.
+
+Like the notebook's ``groupby(...).count().dropna()``, the long-format views
+only contain (date, slot) combinations that had at least one pickup.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+DayMap = dict(enumerate(DAY_NAMES))
+
+MINUTES_PER_DAY = 24*60
+
+
+def _minutes(stamps):
+    values = np.asarray(pd.Series(stamps).to_numpy(), dtype='datetime64[m]')
+    return values.astype(np.int64)
+
+
+def _base_codes(bases):
+    bases = pd.Series(bases)
+    if isinstance(bases.dtype, pd.CategoricalDtype):
+        return bases.cat.codes.to_numpy(), pd.Index(bases.cat.categories.astype(str))
+    codes, uniques = pd.factorize(bases, sort=True)
+    return codes, pd.Index(uniques.astype(str))
+
+
+class CountCube:
+    """Ride counts indexed by (date, time slot, base).
+
+    ``counts[d, s, b]`` is the number of pickups on ``dates[d]`` in slot ``s``
+    (``slot_minutes`` wide, starting at midnight) from ``bases[b]``.
+    """
+
+    def __init__(self, counts, start, bases, slot_minutes=15):
+        counts = np.asarray(counts)
+        if MINUTES_PER_DAY % slot_minutes:
+            raise ValueError('slot_minutes must divide a day, got %r' % slot_minutes)
+        if counts.ndim != 3 or counts.shape[1] != MINUTES_PER_DAY // slot_minutes or counts.shape[2] != len(bases):
+            raise ValueError('counts must have shape (dates, slots, bases)')
+        self.counts = counts
+        self.start = pd.Timestamp(start).normalize()
+        self.bases = pd.Index(bases, name='Base')
+        self.slot_minutes = slot_minutes
+
+    @classmethod
+    def from_frame(cls, frame, slot_minutes=15, column='Date/Time'):
+        minutes = _minutes(frame[column])
+        base_codes, bases = _base_codes(frame['Base'])
+        if (base_codes < 0).any():
+            raise ValueError('Base contains missing values')
+        return cls.from_codes(minutes, base_codes, bases, slot_minutes)
+
+    @classmethod
+    def from_codes(cls, minutes, base_codes, bases, slot_minutes=15):
+        """Build from minutes since the epoch and integer base codes."""
+        slots = MINUTES_PER_DAY // slot_minutes
+        n_bases = len(bases)
+        if len(minutes) == 0:
+            return cls(np.zeros((0, slots, n_bases), dtype=np.int64), '1970-01-01', bases, slot_minutes)
+        days = minutes // MINUTES_PER_DAY
+        first = days.min()
+        n_days = int(days.max() - first) + 1
+        flat = ((days - first)*slots + (minutes % MINUTES_PER_DAY)//slot_minutes)*n_bases + base_codes
+        counts = np.bincount(flat, minlength=n_days*slots*n_bases).reshape(n_days, slots, n_bases)
+        start = pd.Timestamp(int(first)*MINUTES_PER_DAY, unit='m')
+        return cls(counts, start, bases, slot_minutes)
+
+    @classmethod
+    def combine(cls, cubes):
+        """Sum of several cubes (e.g. one per month or partition) on the union of their dates and bases.
+
+        Addition is associative, so partial cubes can be merged in any grouping.
+        """
+        cubes = [c for c in cubes if c.counts.shape[0]]
+        if not cubes:
+            raise ValueError('nothing to combine')
+        slot_minutes = cubes[0].slot_minutes
+        if any(c.slot_minutes != slot_minutes for c in cubes):
+            raise ValueError('cannot combine cubes with different slot widths')
+        start = min(c.start for c in cubes)
+        stop = max(c.start + pd.Timedelta(days=c.counts.shape[0]) for c in cubes)
+        bases = pd.Index(sorted(set().union(*(c.bases for c in cubes))))
+        total = np.zeros(((stop - start).days, cubes[0].counts.shape[1], len(bases)), dtype=np.int64)
+        for c in cubes:
+            offset = (c.start - start).days
+            total[offset:offset + c.counts.shape[0], :, bases.get_indexer(c.bases)] += c.counts
+        return cls(total, start, bases, slot_minutes)
+
+    #axes
+
+    @property
+    def dates(self):
+        return pd.date_range(self.start, periods=self.counts.shape[0], freq='D', name='Date')
+
+    @property
+    def weekdays(self):
+        return self.dates.weekday.to_numpy()
+
+    @property
+    def times(self):
+        """Slot start times as ``datetime.time`` objects (the notebook's ``Time``)."""
+        return [datetime.time(m // 60, m % 60) for m in range(0, MINUTES_PER_DAY, self.slot_minutes)]
+
+    @property
+    def slot_hours(self):
+        """Slot start as fractional hours (cell 73's float ``Time``)."""
+        return np.arange(self.counts.shape[1], dtype=np.float32)*self.slot_minutes/60
+
+    #reductions
+
+    def total(self):
+        return int(self.counts.sum())
+
+    def by_date_slot(self):
+        """(dates x slots) array of rides, summed over bases."""
+        return self.counts.sum(axis=2)
+
+    def daily_totals(self):
+        """Rides per date (cell 57)."""
+        return pd.Series(self.counts.sum(axis=(1, 2)), index=self.dates, name='Rides')
+
+    def base_totals(self):
+        return pd.Series(self.counts.sum(axis=(0, 1)), index=self.bases, name='Rides')
+
+    def weekly_data(self):
+        """Long Date/Day/Time/Rides frame of cell 17."""
+        grid = self.by_date_slot()
+        d, s = np.nonzero(grid)
+        dates = self.dates
+        day = pd.Categorical.from_codes(self.weekdays[d], categories=DAY_NAMES, ordered=True)
+        times = np.array(self.times, dtype=object)
+        return pd.DataFrame({'Date': dates[d].date, 'Day': day, 'Time': times[s], 'Rides': grid[d, s]})
+
+    def daywise(self):
+        """Total rides per week day (cell 18)."""
+        per_day = self.counts.sum(axis=(1, 2))
+        totals = np.bincount(self.weekdays, weights=per_day, minlength=7).astype(np.int64)
+        index = pd.CategoricalIndex(DAY_NAMES, categories=DAY_NAMES, ordered=True, name='Day')
+        return pd.DataFrame({'Rides': totals}, index=index)
+
+    def weekly_mean(self):
+        """Mean rides per (Time, Day) over dates with pickups in that slot (cells 20-21)."""
+        grid = self.by_date_slot().astype(np.float64)
+        present = grid > 0
+        weekday_onehot = np.eye(7)[self.weekdays]
+        sums = grid.T @ weekday_onehot
+        seen = present.T.astype(np.float64) @ weekday_onehot
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / seen
+        columns = pd.CategoricalIndex(DAY_NAMES, categories=DAY_NAMES, ordered=True, name='Day')
+        frame = pd.DataFrame(means, index=pd.Index(self.times, name='Time'), columns=columns)
+        return frame.loc[:, seen.sum(axis=0) > 0]
+
+    def normalized_rides(self):
+        """Rides per slot divided by that date's total, indexed by Date (cells 56-59)."""
+        grid = self.by_date_slot()
+        totals = grid.sum(axis=1)
+        d, s = np.nonzero(grid)
+        times = np.array(self.times, dtype=object)
+        index = pd.Index(self.dates[d].date, name='Date')
+        return pd.DataFrame({'NormalizedRides': grid[d, s] / totals[d], 'Time': times[s]}, index=index)
+
+    def modeling_frame(self):
+        """Day/WeekDay/Time/Base/Rides frame of cell 78 (non-empty combinations only)."""
+        d, s, b = np.nonzero(self.counts)
+        dates = self.dates
+        return pd.DataFrame({
+            'Day': dates.day.to_numpy()[d].astype(np.int8),
+            'WeekDay': self.weekdays[d].astype(np.int8),
+            'Time': self.slot_hours[s],
+            'Base': pd.Categorical.from_codes(b, categories=self.bases),
+            'Rides': self.counts[d, s, b],
+        })
@@ -0,0 +1,98 @@
+"""Vectorized haversine distances between pickups and landmarks.
+
+The notebook's ``haversine(coordinates1, coordinates2)`` works on one pair of
+points at a time; the functions here take whole ``Lat``/``Lon`` arrays and return
+the same distances in miles.
+"""
+from math import radians, cos, sin, asin, sqrt
+
+import numpy as np
+import pandas as pd
+
+#earth radius in miles, same constant as the notebook
+EARTH_RADIUS_MI = 3956
+
+#rows per block when filling the N x M matrix, keeps temporaries to a few MB
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+metro_art_coordinates = (40.7794, -73.9632)
+empire_state_building_coordinates = (40.7484, -73.9857)
+
+LANDMARKS = {'MM': metro_art_coordinates, 'ESB': empire_state_building_coordinates}
+
+
+def haversine(coordinates1, coordinates2):
+    """Row-wise reference implementation copied from cell 29."""
+    lat1, lon1 = coordinates1[0], coordinates1[1]
+    lat2, lon2 = coordinates2[0], coordinates2[1]
+
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+
+    a = sin(dlat/2)**2 + cos(lat1)*cos(lat2)*sin(dlon/2)**2
+    c = 2*asin(sqrt(a))
+    return c*EARTH_RADIUS_MI
+
+
+def _landmark_array(landmarks):
+    if isinstance(landmarks, dict):
+        landmarks = list(landmarks.values())
+    points = np.asarray(landmarks, dtype=np.float64)
+    if points.ndim == 1:
+        points = points[None, :]
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError('landmarks must be (lat, lon) pairs')
+    return points
+
+
+def haversine_vec(lat, lon, landmark):
+    """Distance in miles from one landmark ``(lat, lon)`` to every point."""
+    return haversine_matrix(lat, lon, [landmark])[:, 0]
+
+
+def haversine_matrix(lat, lon, landmarks, chunk_size=DEFAULT_CHUNK_SIZE, out=None):
+    """N x M matrix of distances (miles) from N points to M landmarks.
+
+    The matrix is filled ``chunk_size`` rows at a time so the trigonometric
+    temporaries never grow beyond ``chunk_size x M``. Pass ``out`` to write
+    into a preallocated (for example float32) array.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if lat.shape != lon.shape or lat.ndim != 1:
+        raise ValueError('lat and lon must be 1-D arrays of the same length')
+    points = _landmark_array(landmarks)
+    n, m = len(lat), len(points)
+
+    if out is None:
+        out = np.empty((n, m), dtype=np.float64)
+    elif out.shape != (n, m):
+        raise ValueError('out must have shape (%d, %d)' % (n, m))
+
+    #landmarks play the role of coordinates1 in the row-wise version
+    lat1 = np.radians(points[:, 0])[None, :]
+    lon1 = np.radians(points[:, 1])[None, :]
+    cos_lat1 = np.cos(lat1)
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        lat2 = np.radians(lat[start:stop])[:, None]
+        lon2 = np.radians(lon[start:stop])[:, None]
+
+        a = np.sin((lat2 - lat1)/2)**2 + cos_lat1*np.cos(lat2)*np.sin((lon2 - lon1)/2)**2
+        out[start:stop] = 2*np.arcsin(np.sqrt(a))*EARTH_RADIUS_MI
+    return out
+
+
+def landmark_distances(frame, landmarks=LANDMARKS, prefix='Distance ', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Frame with one ``Distance <name>`` column per landmark (cell 30 layout).
+
+    ``landmarks`` is a ``{name: (lat, lon)}`` dict or a list of ``(lat, lon)``
+    pairs, whose columns are named by position (``Distance 0``, ...).
+    """
+    dist = haversine_matrix(frame['Lat'].to_numpy(), frame['Lon'].to_numpy(),
+                            landmarks, chunk_size=chunk_size)
+    names = landmarks if isinstance(landmarks, dict) else range(dist.shape[1])
+    columns = [prefix + str(name) for name in names]
+    return pd.DataFrame(dist, index=frame.index, columns=columns)
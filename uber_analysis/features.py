@@ -0,0 +1,34 @@
+"""Vectorized time features for the modeling frame (cells 72-80).
+
+Cell 73 converts every timestamp with a Python ``func`` and cell 80 builds
+``Weekend`` with a row-wise ``apply``; here both come from ``.dt`` arithmetic
+on the whole column.
+"""
+import numpy as np
+import pandas as pd
+
+
+def quarter_hour_time(stamps):
+    """Hour plus quarter-hour as a float, e.g. 1:15AM -> 1.25, 12:45 -> 12.75."""
+    stamps = pd.Series(stamps)
+    hour = stamps.dt.hour.to_numpy(dtype=np.float32)
+    quarter = (stamps.dt.minute.to_numpy() // 15).astype(np.float32)
+    return pd.Series(hour + quarter/4, index=stamps.index, name='Time')
+
+
+def weekend_flag(weekday):
+    """1 for Saturday/Sunday (weekday 5 and 6), else 0."""
+    weekday = pd.Series(weekday)
+    return (weekday > 4).astype(np.int8).rename('Weekend')
+
+
+def time_features(stamps):
+    """``Time``, ``WeekDay``, ``Day`` and ``Weekend`` columns in compact dtypes."""
+    stamps = pd.Series(stamps)
+    weekday = stamps.dt.weekday.astype(np.int8)
+    return pd.DataFrame({
+        'Time': quarter_hour_time(stamps),
+        'WeekDay': weekday,
+        'Day': stamps.dt.day.astype(np.int8),
+        'Weekend': weekend_flag(weekday),
+    }, index=stamps.index)
@@ -0,0 +1,235 @@
+"""Next-day rides forecasts per (slot, base) from the count cube.
+
+Cell 78's modeling frame has one row per (Day, WeekDay, Time, Base); the
+notebook stops at a pairplot. ``feature_matrix`` builds the equivalent dense
+design matrix straight from ``CountCube.counts``: cyclical time-of-day and
+weekday encodings, the weekend flag, a base one-hot and lagged slots of the
+same base (yesterday's slot and the one before it, two days, one and two
+weeks back). Every lag is at least a day old, so the matrix for tomorrow can
+be built as soon as today closes.
+
+``DemandForecaster`` fits either a ridge regression, kept as running normal
+equations so a nightly refit only folds in the new day, or scikit-learn's
+``HistGradientBoostingRegressor`` with warm-started extra trees.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from .features import weekend_flag
+
+MODELS = ('ridge', 'hgb')
+
+#lags in days; the extra slot lag is yesterday's preceding slot
+LAG_DAYS = (1, 2, 7, 14)
+
+
+def lag_offsets(slots):
+    """Lags in slots: yesterday's same and preceding slot, then each of ``LAG_DAYS`` beyond the first."""
+    return (slots, slots + 1) + tuple(d*slots for d in LAG_DAYS[1:])
+
+
+def feature_names(cube):
+    """Column names of ``feature_matrix(cube)``."""
+    lags = ['lag_%d' % lag for lag in lag_offsets(cube.counts.shape[1])]
+    return (['time_sin', 'time_cos', 'time_sin2', 'time_cos2', 'weekday_sin', 'weekday_cos', 'weekend']
+            + ['base_%s' % b for b in cube.bases] + lags + ['yesterday_mean'])
+
+
+def min_history(cube):
+    """First day index with a full set of lags."""
+    slots = cube.counts.shape[1]
+    return -(-max(lag_offsets(slots)) // slots)
+
+
+def feature_matrix(cube, days=None):
+    """Design matrix and targets for every (day, slot, base) of ``days``.
+
+    ``days`` are indices into ``cube.dates``; ``len(cube.dates)`` stands for
+    the day after the cube, whose targets are returned as NaN. Rows are
+    ordered by day, then slot, then base. Returns ``(X, y)`` with ``X`` in
+    float32.
+    """
+    n_days, slots, n_bases = cube.counts.shape
+    if days is None:
+        days = np.arange(min_history(cube), n_days)
+    days = np.asarray(days, dtype=np.int64)
+    if len(days) and (days.min() < min_history(cube) or days.max() > n_days):
+        raise ValueError('days must lie in [%d, %d]' % (min_history(cube), n_days))
+
+    #one flat time axis per base, padded with an empty day for the forecast target
+    series = np.zeros((n_days + 1)*slots*n_bases, dtype=np.float32)
+    series[:n_days*slots*n_bases] = cube.counts.reshape(-1)
+    series = series.reshape(n_days + 1, slots, n_bases).reshape((n_days + 1)*slots, n_bases)
+
+    day = np.repeat(days, slots*n_bases)
+    slot = np.tile(np.repeat(np.arange(slots), n_bases), len(days))
+    base = np.tile(np.arange(n_bases), len(days)*slots)
+    flat = day*slots + slot
+    weekday = ((cube.start.weekday() + day) % 7).astype(np.float32)
+    angle = 2*np.pi*slot.astype(np.float32) / slots
+
+    lags = lag_offsets(slots)
+    n_features = 7 + n_bases + len(lags) + 1
+    X = np.empty((len(day), n_features), dtype=np.float32)
+    X[:, 0] = np.sin(angle)
+    X[:, 1] = np.cos(angle)
+    X[:, 2] = np.sin(2*angle)
+    X[:, 3] = np.cos(2*angle)
+    X[:, 4] = np.sin(2*np.pi*weekday / 7)
+    X[:, 5] = np.cos(2*np.pi*weekday / 7)
+    X[:, 6] = weekend_flag(weekday).to_numpy()
+    X[:, 7:7 + n_bases] = np.arange(n_bases) == base[:, None]
+    for i, lag in enumerate(lags):
+        X[:, 7 + n_bases + i] = series[flat - lag, base]
+    daily = series.reshape(n_days + 1, slots, n_bases).mean(axis=1)
+    X[:, -1] = daily[day - 1, base]
+
+    y = series[flat, base].astype(np.float64)
+    y[day == n_days] = np.nan
+    return X, y
+
+
+class DemandForecaster:
+    """Ridge or histogram gradient boosting model of rides per (day, slot, base).
+
+    ``fit`` trains from scratch; ``update`` folds in newly closed days, which
+    costs O(new rows) for ridge and a few extra boosting iterations for
+    ``'hgb'``. Training time, rows and prediction throughput of the last call
+    are kept on the instance.
+    """
+
+    def __init__(self, model='ridge', alpha=1.0, max_iter=200, refit_iter=20, learning_rate=0.1, seed=0):
+        if model not in MODELS:
+            raise ValueError('model must be one of %s, got %r' % (', '.join(MODELS), model))
+        self.model = model
+        self.alpha = alpha
+        self.max_iter = max_iter
+        self.refit_iter = refit_iter
+        self.learning_rate = learning_rate
+        self.seed = seed
+        self.estimator = None
+        self.trained_until = None
+        self.train_seconds = 0.0
+        self.train_rows = 0
+        self.predict_rate = float('nan')
+        self._gram = None
+        self._moment = None
+        self._coef = None
+
+    #ridge as running normal equations (intercept column unpenalized)
+
+    def _accumulate(self, X, y):
+        X1 = np.empty((len(X), X.shape[1] + 1))
+        X1[:, :-1] = X
+        X1[:, -1] = 1
+        if self._gram is None:
+            self._gram = np.zeros((X1.shape[1], X1.shape[1]))
+            self._moment = np.zeros(X1.shape[1])
+        self._gram += X1.T @ X1
+        self._moment += X1.T @ y
+        penalty = np.full(X1.shape[1], float(self.alpha))
+        penalty[-1] = 0
+        self._coef = np.linalg.solve(self._gram + np.diag(penalty), self._moment)
+
+    def _boosting(self):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        return HistGradientBoostingRegressor(loss='poisson', max_iter=self.max_iter, learning_rate=self.learning_rate,
+                                             early_stopping=False, warm_start=True, random_state=self.seed)
+
+    def fit(self, cube, days=None):
+        """Train from scratch on ``days`` (default: every day with full lag history)."""
+        start = time.perf_counter()
+        X, y = feature_matrix(cube, days)
+        if self.model == 'ridge':
+            self._gram = self._moment = None
+            self._accumulate(X, y)
+        else:
+            self.estimator = self._boosting()
+            self.estimator.fit(X, y)
+        self.train_seconds = time.perf_counter() - start
+        self.train_rows = len(y)
+        self.trained_until = int(np.max(days)) if days is not None else cube.counts.shape[0] - 1
+        return self
+
+    def update(self, cube, days):
+        """Refit after ``days`` closed: ridge adds their rows, boosting grows ``refit_iter`` trees."""
+        if self.trained_until is None:
+            return self.fit(cube, days)
+        start = time.perf_counter()
+        days = np.asarray(days, dtype=np.int64)
+        if self.model == 'ridge':
+            X, y = feature_matrix(cube, days)
+            self._accumulate(X, y)
+        else:
+            #warm start keeps the fitted trees and boosts on the full history
+            X, y = feature_matrix(cube, np.arange(min_history(cube), days.max() + 1))
+            self.estimator.set_params(max_iter=self.estimator.max_iter + self.refit_iter)
+            self.estimator.fit(X, y)
+        self.train_seconds = time.perf_counter() - start
+        self.train_rows = len(y)
+        self.trained_until = max(self.trained_until, int(days.max()))
+        return self
+
+    def predict_matrix(self, X):
+        start = time.perf_counter()
+        if self.model == 'ridge':
+            pred = X @ self._coef[:-1].astype(np.float32) + self._coef[-1]
+        else:
+            pred = self.estimator.predict(X)
+        elapsed = time.perf_counter() - start
+        self.predict_rate = len(X) / elapsed if elapsed > 0 else float('inf')
+        return np.clip(pred, 0, None)
+
+    def predict(self, cube, days):
+        """Predicted rides for every (day, slot, base) of ``days``, as a (days, slots, bases) array."""
+        X, _ = feature_matrix(cube, days)
+        return self.predict_matrix(X).reshape(len(days), cube.counts.shape[1], cube.counts.shape[2])
+
+    def forecast(self, cube):
+        """Tomorrow's rides per slot and base, in the Time/Base/Rides layout of cell 78."""
+        slots, n_bases = cube.counts.shape[1:]
+        pred = self.predict(cube, [cube.counts.shape[0]])[0]
+        return pd.DataFrame({
+            'Date': cube.start + pd.Timedelta(days=cube.counts.shape[0]),
+            'Time': np.repeat(cube.slot_hours, n_bases),
+            'Base': pd.Categorical.from_codes(np.tile(np.arange(n_bases), slots), categories=cube.bases),
+            'Rides': pred.reshape(-1).astype(np.float32),
+        })
+
+
+def scores(actual, predicted):
+    """MAE, RMSE and WAPE (total absolute error over total rides)."""
+    err = np.asarray(predicted, dtype=np.float64) - actual
+    total = np.abs(actual).sum()
+    return {'mae': np.abs(err).mean(), 'rmse': np.sqrt((err**2).mean()),
+            'wape': np.abs(err).sum() / total if total else float('nan')}
+
+
+def backtest(cube, model='ridge', holdout_days=7, **kwargs):
+    """Nightly-retrain simulation over the last ``holdout_days`` of the cube.
+
+    Trains on everything before the holdout, then for each held-out day
+    forecasts it, scores it against the actual counts and the seasonal naive
+    forecast (same slot a week earlier), and folds it in with ``update``.
+    Returns the forecaster and a per-day score frame.
+    """
+    n_days = cube.counts.shape[0]
+    first = n_days - holdout_days
+    if first <= min_history(cube):
+        raise ValueError('need more than %d days before the holdout, got %d' % (min_history(cube), first))
+    forecaster = DemandForecaster(model, **kwargs)
+    forecaster.fit(cube, np.arange(min_history(cube), first))
+    rows = []
+    for day in range(first, n_days):
+        actual = cube.counts[day].astype(np.float64)
+        predicted = forecaster.predict(cube, [day])[0]
+        row = {'Date': cube.dates[day], 'train_seconds': forecaster.train_seconds,
+               'train_rows': forecaster.train_rows, 'predictions_per_second': forecaster.predict_rate}
+        row.update(scores(actual, predicted))
+        row['naive_wape'] = scores(actual, cube.counts[day - 7])['wape']
+        rows.append(row)
+        forecaster.update(cube, [day])
+    return forecaster, pd.DataFrame(rows).set_index('Date')
@@ -0,0 +1,133 @@
+"""Integer geohash cell IDs for pickups.
+
+``encode`` quantizes lat/lon to ``bits`` bits in total and interleaves them
+exactly like a geohash (longitude first), so a 5*p-bit cell ID is the integer
+value of the p-character geohash and spatial grouping/joins become integer
+operations. Cells sharing a prefix are nested: ``cell >> k`` is the parent
+cell at ``bits - k`` bits.
+"""
+import numpy as np
+import pandas as pd
+
+#35 bits = a 7-character geohash, about 150 x 150 m in NYC
+DEFAULT_BITS = 35
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+_SPREAD_MASKS = [(16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                 (2, 0x3333333333333333), (1, 0x5555555555555555)]
+
+
+def _split_bits(bits):
+    if not 1 <= bits <= 62:
+        raise ValueError('bits must be between 1 and 62, got %r' % bits)
+    lon_bits = (bits + 1) // 2
+    return bits - lon_bits, lon_bits
+
+
+def _spread(x):
+    """Insert a zero bit above each of the low 32 bits of ``x``."""
+    x = x.astype(np.uint64)
+    for shift, mask in _SPREAD_MASKS:
+        x = (x | (x << np.uint64(shift))) & np.uint64(mask)
+    return x
+
+
+def _compact(x):
+    """Inverse of ``_spread``: gather the even bits of ``x`` into the low 32 bits."""
+    x = x.astype(np.uint64) & np.uint64(0x5555555555555555)
+    masks = [mask for _, mask in _SPREAD_MASKS[:-1]][::-1] + [0x00000000FFFFFFFF]
+    for (shift, _), mask in zip(_SPREAD_MASKS[::-1], masks):
+        x = (x | (x >> np.uint64(shift))) & np.uint64(mask)
+    return x.astype(np.int64)
+
+
+def _interleave(q_lat, q_lon, bits):
+    lat_bits, lon_bits = _split_bits(bits)
+    if lat_bits == lon_bits:
+        return ((_spread(q_lon) << np.uint64(1)) | _spread(q_lat)).astype(np.int64)
+    return (_spread(q_lon) | (_spread(q_lat) << np.uint64(1))).astype(np.int64)
+
+
+def _deinterleave(cells, bits):
+    lat_bits, lon_bits = _split_bits(bits)
+    cells = np.asarray(cells, dtype=np.int64)
+    if lat_bits == lon_bits:
+        return _compact(cells), _compact(cells >> 1)
+    return _compact(cells >> 1), _compact(cells)
+
+
+def quantize(lat, lon, bits=DEFAULT_BITS):
+    """Row and column of each point on the ``bits``-bit geohash grid."""
+    lat_bits, lon_bits = _split_bits(bits)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    q_lat = np.clip(np.floor((lat + 90) / 180 * (1 << lat_bits)), 0, (1 << lat_bits) - 1).astype(np.int64)
+    q_lon = np.clip(np.floor((lon + 180) / 360 * (1 << lon_bits)), 0, (1 << lon_bits) - 1).astype(np.int64)
+    return q_lat, q_lon
+
+
+def encode(lat, lon, bits=DEFAULT_BITS):
+    """int64 geohash cell ID of every point."""
+    q_lat, q_lon = quantize(lat, lon, bits)
+    return _interleave(q_lat, q_lon, bits)
+
+
+def cell_size(bits=DEFAULT_BITS):
+    """(lat, lon) size of one cell in degrees."""
+    lat_bits, lon_bits = _split_bits(bits)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def decode(cells, bits=DEFAULT_BITS):
+    """(lat, lon) of the centre of each cell."""
+    q_lat, q_lon = _deinterleave(cells, bits)
+    d_lat, d_lon = cell_size(bits)
+    return (q_lat + 0.5)*d_lat - 90, (q_lon + 0.5)*d_lon - 180
+
+
+def neighbors(cells, bits=DEFAULT_BITS):
+    """``(n, 8)`` array of the cells around each cell (N, NE, E, SE, S, SW, W, NW).
+
+    Longitude wraps around; cells beyond the poles are -1.
+    """
+    lat_bits, lon_bits = _split_bits(bits)
+    q_lat, q_lon = _deinterleave(cells, bits)
+    offsets = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+    out = np.empty((len(q_lat), len(offsets)), dtype=np.int64)
+    for j, (d_lat, d_lon) in enumerate(offsets):
+        n_lat = q_lat + d_lat
+        n_lon = (q_lon + d_lon) % (1 << lon_bits)
+        valid = (n_lat >= 0) & (n_lat < (1 << lat_bits))
+        out[:, j] = np.where(valid, _interleave(np.clip(n_lat, 0, None), n_lon, bits), -1)
+    return out
+
+
+def to_geohash(cells, bits=DEFAULT_BITS):
+    """Geohash strings of the cells; ``bits`` must be a multiple of 5."""
+    if bits % 5:
+        raise ValueError('geohash strings need a multiple of 5 bits, got %r' % bits)
+    cells = np.asarray(cells, dtype=np.int64)
+    alphabet = np.array(list(GEOHASH_ALPHABET))
+    chars = [alphabet[(cells >> (bits - 5*(i + 1))) & 31] for i in range(bits // 5)]
+    return np.array([''.join(c) for c in zip(*chars)]) if len(cells) else np.array([], dtype=str)
+
+
+def cell_counts(cells, times):
+    """Rides per (time bin, cell), one row per non-empty combination.
+
+    ``times`` is typically the ``BinnedHour`` column.
+    """
+    time_codes, time_values = pd.factorize(pd.Series(times), sort=True)
+    cell_codes, cell_values = pd.factorize(np.asarray(cells), sort=True)
+    keys, rides = np.unique(time_codes.astype(np.int64)*len(cell_values) + cell_codes, return_counts=True)
+    t, c = np.divmod(keys, len(cell_values))
+    return pd.DataFrame({'BinnedHour': np.asarray(time_values)[t], 'Cell': cell_values[c], 'Rides': rides})
+
+
+def neighborhood_counts(counts, bits=DEFAULT_BITS):
+    """Rides per cell including its 8 neighbours, from a ``Cell``/``Rides`` frame (e.g. hotspot smoothing)."""
+    totals = counts.groupby('Cell')['Rides'].sum()
+    around = neighbors(totals.index.to_numpy(), bits)
+    looked_up = totals.reindex(around.ravel(), fill_value=0).to_numpy().reshape(around.shape)
+    return (totals + looked_up.sum(axis=1)).astype(totals.dtype).rename('Rides')
@@ -0,0 +1,162 @@
+"""Grid-aggregated point data for the folium heatmaps (cells 40-47).
+
+Instead of shipping every (sampled) pickup to the browser, pickups are snapped
+to a fixed lat/lon grid (square or hexagonal) and only non-empty cells are
+emitted, each weighted by its ride count.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+#roughly 0.35 x 0.26 miles at NYC's latitude
+DEFAULT_CELL_DEG = 0.005
+
+HeatMapFrames = namedtuple('HeatMapFrames', ['index', 'data'])
+
+
+def grid_bounds(lat, lon):
+    return float(np.min(lat)), float(np.max(lat)), float(np.min(lon)), float(np.max(lon))
+
+
+def grid_codes(lat, lon, cell_deg=DEFAULT_CELL_DEG, bounds=None):
+    """Row/column of each point on a ``cell_deg`` grid, plus the grid shape.
+
+    Points outside ``bounds`` get code -1.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    lat_min, lat_max, lon_min, lon_max = bounds or grid_bounds(lat, lon)
+    n_rows = int(np.floor((lat_max - lat_min) / cell_deg)) + 1
+    n_cols = int(np.floor((lon_max - lon_min) / cell_deg)) + 1
+    rows = np.floor((lat - lat_min) / cell_deg).astype(np.int64)
+    cols = np.floor((lon - lon_min) / cell_deg).astype(np.int64)
+    inside = (rows >= 0) & (rows < n_rows) & (cols >= 0) & (cols < n_cols)
+    flat = np.where(inside, rows*n_cols + cols, -1)
+    return flat, (n_rows, n_cols), (lat_min, lon_min)
+
+
+def _cell_centres(flat, shape, origin, cell_deg):
+    rows, cols = np.divmod(flat, shape[1])
+    return origin[0] + (rows + 0.5)*cell_deg, origin[1] + (cols + 0.5)*cell_deg
+
+
+def hex_codes(lat, lon, size_deg=DEFAULT_CELL_DEG, origin=None):
+    """Axial (q, r) coordinates of each point on a pointy-top hexagonal grid.
+
+    ``size_deg`` is the centre-to-corner distance in degrees of latitude;
+    longitudes are scaled by cos(latitude) so the hexagons stay regular on
+    the ground.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if origin is None:
+        origin = (float(np.mean(lat)), float(np.mean(lon)))
+    x = (lon - origin[1])*np.cos(np.radians(origin[0])) / size_deg
+    y = (lat - origin[0]) / size_deg
+
+    #fractional cube coordinates, rounded to the nearest hexagon
+    q = np.sqrt(3)/3*x - y/3
+    r = 2/3*y
+    cube = np.stack([q, r, -q - r])
+    rounded = np.round(cube)
+    diff = np.abs(rounded - cube)
+    fix_q = (diff[0] > diff[1]) & (diff[0] > diff[2])
+    fix_r = ~fix_q & (diff[1] > diff[2])
+    rounded[0] = np.where(fix_q, -rounded[1] - rounded[2], rounded[0])
+    rounded[1] = np.where(fix_r, -rounded[0] - rounded[2], rounded[1])
+    return rounded[0].astype(np.int64), rounded[1].astype(np.int64), origin
+
+
+def hex_centres(q, r, size_deg, origin):
+    lat = origin[0] + size_deg*1.5*r
+    lon = origin[1] + size_deg*np.sqrt(3)*(q + r/2) / np.cos(np.radians(origin[0]))
+    return lat, lon
+
+
+def _scaled(totals, intensity):
+    if len(totals) and totals.max() > 0:
+        return totals*(intensity / totals.max())
+    return totals
+
+
+def heatmap_points(lat, lon, weights=None, cell_deg=DEFAULT_CELL_DEG, grid='square',
+                   bounds=None, max_points=None, intensity=1.0, precision=5):
+    """``(k, 3)`` array of ``[lat, lon, weight]`` cells for a static ``HeatMap``.
+
+    Pickups are binned on a square (``grid='square'``) or hexagonal
+    (``grid='hex'``) grid of ``cell_deg`` degrees; each non-empty cell becomes
+    one point weighted by its ride count (or summed ``weights``), scaled so
+    the busiest cell has weight ``intensity``. ``max_points`` keeps only the
+    heaviest cells.
+    """
+    w = None if weights is None else np.asarray(weights, dtype=np.float64)
+    if grid == 'square':
+        flat, shape, origin = grid_codes(lat, lon, cell_deg, bounds)
+        keep = flat >= 0
+        cells, inverse = np.unique(flat[keep], return_inverse=True)
+        totals = np.bincount(inverse, weights=None if w is None else w[keep], minlength=len(cells))
+        cell_lat, cell_lon = _cell_centres(cells, shape, origin, cell_deg)
+    elif grid == 'hex':
+        q, r, origin = hex_codes(lat, lon, cell_deg)
+        q_min, r_min = q.min(), r.min()
+        span = r.max() - r_min + 1
+        cells, inverse = np.unique((q - q_min)*span + (r - r_min), return_inverse=True)
+        totals = np.bincount(inverse, weights=w, minlength=len(cells))
+        cell_q, cell_r = np.divmod(cells, span)
+        cell_lat, cell_lon = hex_centres(cell_q + q_min, cell_r + r_min, cell_deg, origin)
+    else:
+        raise ValueError("grid must be 'square' or 'hex', got %r" % grid)
+
+    totals = _scaled(totals.astype(np.float64), intensity)
+    points = np.column_stack([cell_lat.round(precision), cell_lon.round(precision), totals.round(4)])
+    if max_points is not None and len(points) > max_points:
+        points = points[np.argsort(-totals, kind='stable')[:max_points]]
+    return points
+
+
+def heatmap_frames(frame, cell_deg=DEFAULT_CELL_DEG, bounds=None, time_column='BinnedHour',
+                   times=None, weights=None, max_points=None, index_format='%m%d%Y, %H:%M:%S', precision=5):
+    """Per-time-bin ``[[lat, lon, weight], ...]`` lists for ``HeatMapWithTime``.
+
+    Each bin of ``time_column`` becomes one frame holding the non-empty grid
+    cells of that bin, weighted by ride count (or by the sum of ``weights``)
+    and scaled so that the busiest cell of the whole series has weight 1.
+    ``times`` can be passed instead of a ``time_column`` in ``frame``;
+    ``max_points`` keeps only the heaviest cells of each frame.
+    """
+    flat, shape, origin = grid_codes(frame['Lat'].to_numpy(), frame['Lon'].to_numpy(), cell_deg, bounds)
+    time_codes, times = pd.factorize(frame[time_column] if times is None else times, sort=True)
+    keep = flat >= 0
+    n_cells = shape[0]*shape[1]
+    key = time_codes[keep].astype(np.int64)*n_cells + flat[keep]
+    w = None if weights is None else np.asarray(weights, dtype=np.float64)[keep]
+
+    keys, inverse = np.unique(key, return_inverse=True)
+    totals = _scaled(np.bincount(inverse, weights=w, minlength=len(keys)).astype(np.float64), 1.0)
+
+    frame_codes, cells = np.divmod(keys, n_cells)
+    if max_points is not None:
+        #heaviest cells first within each frame, then keep the first max_points of each
+        order = np.lexsort((-totals, frame_codes))
+        frame_codes, cells, totals = frame_codes[order], cells[order], totals[order]
+        starts = np.searchsorted(frame_codes, frame_codes)
+        keep = np.arange(len(frame_codes)) - starts < max_points
+        frame_codes, cells, totals = frame_codes[keep], cells[keep], totals[keep]
+
+    lat, lon = _cell_centres(cells, shape, origin, cell_deg)
+    points = np.column_stack([lat.round(precision), lon.round(precision), totals.round(4)])
+    bounds_at = np.searchsorted(frame_codes, np.arange(len(times) + 1))
+    data = [points[bounds_at[i]:bounds_at[i + 1]].tolist() for i in range(len(times))]
+    index = [t.strftime(index_format) for t in pd.DatetimeIndex(times)]
+    return HeatMapFrames(index, data)
+
+
+def heatmap_with_time(frames, location, zoom_start=10, **kwargs):
+    """folium map with a ``HeatMapWithTime`` layer built from ``heatmap_frames``."""
+    import folium
+    from folium.plugins import HeatMapWithTime
+
+    uber_map = folium.Map(location=location, zoom_start=zoom_start)
+    HeatMapWithTime(frames.data, index=frames.index, **kwargs).add_to(uber_map)
+    return uber_map
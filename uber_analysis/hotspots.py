@@ -0,0 +1,204 @@
+"""Pickup hotspots per time window by grid-accelerated DBSCAN.
+
+The notebook only eyeballs density (cell 27 and the folium heatmaps). Here
+pickups are snapped to square cells whose diagonal is ``eps`` miles, sized
+with the haversine metric at the middle latitude of the data, so every pair
+of points in one cell is within ``eps``, and a cell's 3 x 3 neighbourhood
+stands in for the ``eps`` ball of its points. DBSCAN then runs on the cells
+rather than the points (the usual grid approximation):
+
+* a cell is *core* when its neighbourhood holds at least ``min_samples``
+  pickups;
+* clusters are the connected components of adjacent core cells;
+* non-core cells next to a core cell join that cell's cluster, the rest are
+  noise.
+
+Rows are binned in chunks into (window, cell) counts and coordinate sums;
+that table (32 bytes per occupied cell) is the only structure that grows
+with the input. Windows are independent and are clustered in batches of at
+most ``batch_cells`` occupied cells, spread across worker processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .distance import EARTH_RADIUS_MI
+
+DEFAULT_EPS_MILES = 0.25
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_CHUNK_SIZE = 1 << 18
+#occupied (window, cell) pairs clustered per batch, bounds the clustering temporaries
+DEFAULT_BATCH_CELLS = 1 << 17
+
+#3 x 3 neighbourhood, the cell itself first
+OFFSETS = [(0, 0)] + [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc]
+
+
+def cell_degrees(eps_miles, lat0):
+    """Cell height and width in degrees for a cell diagonal of ``eps_miles`` at latitude ``lat0``.
+
+    Inverts the haversine formula along a meridian and along the parallel ``lat0``.
+    """
+    side = eps_miles / np.sqrt(2)
+    dlat = np.degrees(side / EARTH_RADIUS_MI)
+    #haversine between (lat0, 0) and (lat0, dlon) equals side
+    half = np.sin(side / (2*EARTH_RADIUS_MI)) / np.cos(np.radians(lat0))
+    dlon = np.degrees(2*np.arcsin(min(half, 1.0)))
+    return dlat, dlon
+
+
+class CellGrid:
+    """Regular lat/lon grid with a one-cell border, so neighbour keys never wrap across rows."""
+
+    def __init__(self, bounds, eps_miles):
+        lat_min, lat_max, lon_min, lon_max = bounds
+        self.dlat, self.dlon = cell_degrees(eps_miles, (lat_min + lat_max) / 2)
+        self.origin = (lat_min - self.dlat, lon_min - self.dlon)
+        self.n_rows = int(np.floor((lat_max - lat_min) / self.dlat)) + 3
+        self.n_cols = int(np.floor((lon_max - lon_min) / self.dlon)) + 3
+
+    @property
+    def n_cells(self):
+        return self.n_rows*self.n_cols
+
+    def codes(self, lat, lon):
+        """Flat cell code of each point; check ``contains`` for points outside the bounds."""
+        rows = np.floor((np.asarray(lat, dtype=np.float64) - self.origin[0]) / self.dlat).astype(np.int64)
+        cols = np.floor((np.asarray(lon, dtype=np.float64) - self.origin[1]) / self.dlon).astype(np.int64)
+        return rows*self.n_cols + cols
+
+    def contains(self, codes):
+        """Codes of points inside the bounds, i.e. off the border ring."""
+        rows, cols = np.divmod(codes, self.n_cols)
+        return (rows >= 1) & (rows < self.n_rows - 1) & (cols >= 1) & (cols < self.n_cols - 1)
+
+    def offset(self, dr, dc):
+        return dr*self.n_cols + dc
+
+
+def window_cells(lat, lon, windows, grid, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Sorted (window, cell) keys with pickup counts and Lat/Lon sums, built chunk by chunk."""
+    keys = np.empty(0, dtype=np.int64)
+    sums = np.empty((0, 3))
+    for start in range(0, len(lat), chunk_size):
+        stop = start + chunk_size
+        cells = grid.codes(lat[start:stop], lon[start:stop])
+        inside = grid.contains(cells)
+        chunk = np.asarray(windows[start:stop], dtype=np.int64)[inside]*grid.n_cells + cells[inside]
+        values = np.column_stack([np.ones(len(chunk)), lat[start:stop][inside], lon[start:stop][inside]])
+        #fold the chunk into the running table: unique keys, summed columns
+        merged, inverse = np.unique(np.concatenate([keys, chunk]), return_inverse=True)
+        stacked = np.concatenate([sums, values])
+        sums = np.column_stack([np.bincount(inverse, stacked[:, k], minlength=len(merged)) for k in range(3)])
+        keys = merged
+    return keys, sums
+
+
+def cluster_cells(keys, counts, grid, min_samples=DEFAULT_MIN_SAMPLES):
+    """DBSCAN labels of sorted (window, cell) ``keys``; -1 marks noise cells.
+
+    Labels are unique across windows: a cluster never spans two windows
+    because neighbour keys never leave their window's block.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    n = len(keys)
+    neighbours = np.full((len(OFFSETS), n), -1, dtype=np.int64)
+    for k, (dr, dc) in enumerate(OFFSETS):
+        target = keys + grid.offset(dr, dc)
+        idx = np.minimum(np.searchsorted(keys, target), max(n - 1, 0))
+        found = keys[idx] == target if n else np.zeros(0, dtype=bool)
+        neighbours[k, found] = idx[found]
+    present = neighbours >= 0
+    around = np.where(present, counts[np.maximum(neighbours, 0)], 0).sum(axis=0)
+    core = around >= min_samples
+
+    #edges between adjacent core cells
+    core_pair = present & core[np.maximum(neighbours, 0)] & core
+    src = np.broadcast_to(np.arange(n), neighbours.shape)[core_pair]
+    graph = coo_matrix((np.ones(len(src)), (src, neighbours[core_pair])), shape=(n, n))
+    _, components = connected_components(graph, directed=False)
+    #renumber so that only core components get labels 0..k-1
+    _, labels_core = np.unique(components[core], return_inverse=True)
+    labels = np.full(n, -1, dtype=np.int64)
+    labels[core] = labels_core
+
+    #border cells join the first core neighbour's cluster
+    border = ~core
+    for k in range(1, len(OFFSETS)):
+        nb = neighbours[k]
+        take = border & (labels < 0) & (nb >= 0) & core[np.maximum(nb, 0)]
+        labels[take] = labels[nb[take]]
+    return labels
+
+
+def _cluster_batch(keys, sums, grid, min_samples):
+    labels = cluster_cells(keys, sums[:, 0], grid, min_samples)
+    member = labels >= 0
+    n_clusters = labels.max() + 1 if member.any() else 0
+    size = np.bincount(labels[member], sums[member, 0], minlength=n_clusters)
+    lat = np.bincount(labels[member], sums[member, 1], minlength=n_clusters) / np.maximum(size, 1)
+    lon = np.bincount(labels[member], sums[member, 2], minlength=n_clusters) / np.maximum(size, 1)
+    cells = np.bincount(labels[member], minlength=n_clusters)
+    windows = np.zeros(n_clusters, dtype=np.int64)
+    windows[labels[member]] = keys[member] // grid.n_cells
+    return windows, lat, lon, size.astype(np.int64), cells
+
+
+def _window_batches(keys, n_cells, parts):
+    """Split sorted keys into at most ``parts`` contiguous runs without splitting a window."""
+    window_of = keys // n_cells
+    cuts = np.linspace(0, len(keys), max(parts, 1) + 1).astype(np.int64)[1:-1]
+    #move each cut back to the first key of its window
+    cuts = np.searchsorted(window_of, window_of[cuts]) if len(keys) else cuts[:0]
+    bounds = np.unique(np.concatenate([[0], cuts, [len(keys)]]))
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def grid_dbscan(lat, lon, windows=None, eps_miles=DEFAULT_EPS_MILES, min_samples=DEFAULT_MIN_SAMPLES,
+                workers=1, chunk_size=DEFAULT_CHUNK_SIZE, bounds=None, batch_cells=DEFAULT_BATCH_CELLS):
+    """Hotspots of each window: ``(window codes, Lat, Lon, Size, Cells)`` arrays, one entry per cluster.
+
+    ``windows`` are integer window codes per pickup (default: one window).
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if windows is None:
+        windows = np.zeros(len(lat), dtype=np.int64)
+    if bounds is None:
+        bounds = float(lat.min()), float(lat.max()), float(lon.min()), float(lon.max())
+    grid = CellGrid(bounds, eps_miles)
+    keys, sums = window_cells(lat, lon, windows, grid, chunk_size)
+
+    parts = max(workers, -(-len(keys) // batch_cells))
+    args = [(keys[a:b], sums[a:b], grid, min_samples) for a, b in _window_batches(keys, grid.n_cells, parts)]
+    if workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_cluster_batch, *zip(*args)))
+    else:
+        results = [_cluster_batch(*a) for a in args]
+    if not results:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty, empty.astype(np.int64), empty.astype(np.int64)
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+def hotspots(frame, eps_miles=DEFAULT_EPS_MILES, min_samples=DEFAULT_MIN_SAMPLES, time_column='BinnedHour',
+             times=None, workers=1, top=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Hotspot centroids and sizes per ``time_column`` window, largest first within each window.
+
+    ``times`` can be passed instead of a ``time_column`` in ``frame``;
+    ``top`` keeps only the largest hotspots of each window.
+    """
+    codes, values = pd.factorize(frame[time_column] if times is None else times, sort=True)
+    window, lat, lon, size, cells = grid_dbscan(frame['Lat'].to_numpy(), frame['Lon'].to_numpy(), codes,
+                                                eps_miles, min_samples, workers, chunk_size)
+    result = pd.DataFrame({time_column: np.asarray(values)[window], 'Lat': lat, 'Lon': lon,
+                           'Size': size, 'Cells': cells})
+    result = result.iloc[np.lexsort((-size, window))].reset_index(drop=True)
+    result.insert(1, 'Hotspot', result.groupby(time_column, sort=False).cumcount())
+    if top is not None:
+        result = result[result['Hotspot'] < top].reset_index(drop=True)
+    return result
@@ -0,0 +1,154 @@
+"""Incremental append mode: fold new CSV drops into persisted aggregates.
+
+``RunningAggregates`` keeps the (date x slot x base) count cube plus, per
+(weekday, slot), the number of dates with rides, the sum of rides, and the
+count, sum and sum of squares of the normalized rides. That is everything the
+weekly means (cell 20), ``daywise`` (cell 18) and the weekday/weekend t-test
+(cells 56-66) need. Appending a file costs O(new rows) plus O(slots) for each
+date it touches; only outputs that depend on the touched dates are rewritten.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .cube import DAY_NAMES, CountCube
+from .stats import moments_from_sums, ttest_from_moments
+
+SUMS = ('days', 'rides', 'norm_n', 'norm_sum', 'norm_sq')
+
+
+def _date_contributions(grid, weekdays):
+    """(7 x slots) sums contributed by the given (dates x slots) ride rows."""
+    grid = grid.astype(np.float64)
+    present = grid > 0
+    totals = grid.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        norm = np.where(present, grid / totals, 0.0)
+    onehot = np.zeros((len(weekdays), 7))
+    onehot[np.arange(len(weekdays)), weekdays] = 1
+    return {'days': onehot.T @ present, 'rides': onehot.T @ grid, 'norm_n': onehot.T @ present,
+            'norm_sum': onehot.T @ norm, 'norm_sq': onehot.T @ norm**2}
+
+
+class RunningAggregates:
+    """Persisted running aggregates, updated one input file at a time."""
+
+    def __init__(self, slot_minutes=15):
+        self.slot_minutes = slot_minutes
+        self.cube = None
+        n_slots = 24*60 // slot_minutes
+        self.sums = {name: np.zeros((7, n_slots)) for name in SUMS}
+        self.files = set()
+
+    @property
+    def n_slots(self):
+        return 24*60 // self.slot_minutes
+
+    def append_frame(self, frame):
+        """Fold a parsed pickup frame in; returns the dates it touched."""
+        new = CountCube.from_frame(frame, slot_minutes=self.slot_minutes)
+        if not new.counts.shape[0]:
+            return pd.DatetimeIndex([])
+        touched = new.dates[new.counts.sum(axis=(1, 2)) > 0]
+
+        if self.cube is not None:
+            #take the touched dates' old contribution out before adding the merged one back
+            old_rows = self.cube.dates.get_indexer(touched)
+            known = old_rows >= 0
+            if known.any():
+                rows = old_rows[known]
+                self._add(self.cube.by_date_slot()[rows], touched[known].weekday.to_numpy(), -1)
+            self.cube = CountCube.combine([self.cube, new])
+        else:
+            self.cube = new
+        rows = self.cube.dates.get_indexer(touched)
+        self._add(self.cube.by_date_slot()[rows], touched.weekday.to_numpy(), +1)
+        return touched
+
+    def _add(self, grid, weekdays, sign):
+        for name, value in _date_contributions(grid, weekdays).items():
+            self.sums[name] += sign*value
+
+    def append_file(self, path):
+        """Ingest one CSV unless its content was already folded in; returns the touched dates."""
+        from .ingest import file_hash, read_pickups
+
+        digest = file_hash(path)
+        if digest in self.files:
+            return pd.DatetimeIndex([])
+        touched = self.append_frame(read_pickups(path))
+        self.files.add(digest)
+        return touched
+
+    #outputs
+
+    def _times(self):
+        return pd.Index(self.cube.times, name='Time')
+
+    def weekly_mean(self):
+        """Mean rides per (Time, Day), as in cells 20-21."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = self.sums['rides'] / self.sums['days']
+        columns = pd.CategoricalIndex(DAY_NAMES, categories=DAY_NAMES, ordered=True, name='Day')
+        frame = pd.DataFrame(means.T, index=self._times(), columns=columns)
+        return frame.loc[:, self.sums['days'].sum(axis=1) > 0]
+
+    def daywise(self):
+        index = pd.CategoricalIndex(DAY_NAMES, categories=DAY_NAMES, ordered=True, name='Day')
+        return pd.DataFrame({'Rides': self.sums['rides'].sum(axis=1).round().astype(np.int64)}, index=index)
+
+    def ttest(self, equal_var=True):
+        """Weekday vs weekend t-test from the running normalized-ride moments."""
+        groups = []
+        for days in (slice(0, 5), slice(5, 7)):
+            n = self.sums['norm_n'][days].sum(axis=0)
+            mean, var = moments_from_sums(n, self.sums['norm_sum'][days].sum(axis=0),
+                                          self.sums['norm_sq'][days].sum(axis=0))
+            groups += [n, mean, var]
+        statistic, pvalue = ttest_from_moments(*groups, equal_var=equal_var)
+        return pd.DataFrame({'statistic': statistic, 'pvalue': pvalue}, index=self._times())
+
+    def outputs(self):
+        return {'weekly_mean': self.weekly_mean, 'daywise': self.daywise, 'ttestvals': self.ttest,
+                'daily_totals': self.cube.daily_totals}
+
+    def write_outputs(self, output_dir, touched=None):
+        """Rewrite the output CSVs after an append that touched the ``touched`` dates.
+
+        Every output depends on all weekdays' sums, so any touched date
+        rewrites all of them; an append that touched nothing (e.g. an already
+        ingested file) rewrites nothing. Pass ``touched=None`` to force a write.
+        """
+        if touched is not None and len(touched) == 0:
+            return []
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+        for name, build in self.outputs().items():
+            path = os.path.join(output_dir, name + '.csv')
+            build().to_csv(path)
+            written.append(path)
+        return written
+
+    #persistence
+
+    def save(self, path):
+        state = {'slot_minutes': self.slot_minutes, 'files': np.array(sorted(self.files), dtype=str)}
+        state.update(('sum_' + name, value) for name, value in self.sums.items())
+        if self.cube is not None:
+            state.update(counts=self.cube.counts, start=str(self.cube.start),
+                         bases=np.array(self.cube.bases, dtype=str))
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, **state)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            agg = cls(int(f['slot_minutes']))
+            agg.files = set(str(x) for x in f['files'])
+            for name in SUMS:
+                agg.sums[name] = f['sum_' + name]
+            if 'counts' in f:
+                agg.cube = CountCube(f['counts'], pd.Timestamp(str(f['start'])), list(f['bases']), agg.slot_minutes)
+        return agg
@@ -0,0 +1,117 @@
+"""Loading the raw ``uber-raw-data-*.csv`` files.
+
+``load_pickups`` replaces cell 3's ``pd.read_csv`` plus cell 6's
+``pd.to_datetime``: timestamps are parsed with an explicit format, Lat/Lon are
+stored as float32 and Base as a categorical, and the parsed frame is written
+once to a columnar cache (Feather or Parquet) keyed by the source file's hash.
+Later runs memory-map the cache instead of parsing the CSV again. The cache
+needs pyarrow (the ``cache`` extra); without it the CSV is parsed every time.
+"""
+import hashlib
+import importlib.util
+import os
+import time
+import warnings
+
+import pandas as pd
+
+#format of the Date/Time column in the 2014 files, e.g. '7/1/2014 0:03:00'
+DATETIME_FORMAT = '%m/%d/%Y %H:%M:%S'
+
+CSV_DTYPES = {'Lat': 'float32', 'Lon': 'float32', 'Base': 'category'}
+
+CACHE_FORMATS = ('feather', 'parquet')
+
+DEFAULT_CACHE_DIR = '.uber_cache'
+
+
+def file_hash(path, block_size=1 << 20):
+    """SHA-1 of the file contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_datetime(values):
+    return pd.to_datetime(values, format=DATETIME_FORMAT)
+
+
+def read_pickups(path, **kwargs):
+    """Parse a raw CSV into the compact schema, without any caching."""
+    frame = pd.read_csv(path, dtype=CSV_DTYPES, **kwargs)
+    frame['Date/Time'] = parse_datetime(frame['Date/Time'])
+    return frame
+
+
+def cache_path(path, cache_dir=DEFAULT_CACHE_DIR, fmt='feather', digest=None):
+    if fmt not in CACHE_FORMATS:
+        raise ValueError('fmt must be one of %s, got %r' % (CACHE_FORMATS, fmt))
+    if digest is None:
+        digest = file_hash(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, '%s-%s.%s' % (stem, digest[:16], fmt))
+
+
+def _cache_engine_missing(fmt):
+    """Name of the library ``fmt`` needs when it is not installed, else None."""
+    if importlib.util.find_spec('pyarrow') is not None:
+        return None
+    if fmt == 'parquet' and importlib.util.find_spec('fastparquet') is not None:
+        return None
+    return 'pyarrow'
+
+
+def _write_cache(frame, target, fmt):
+    tmp = target + '.tmp'
+    if fmt == 'feather':
+        #uncompressed so that the file can be memory-mapped without a decode step
+        frame.to_feather(tmp, compression='uncompressed')
+    else:
+        frame.to_parquet(tmp, index=False)
+    os.replace(tmp, target)
+
+
+def _read_cache(target, fmt):
+    if fmt == 'feather':
+        from pyarrow import feather
+        return feather.read_table(target, memory_map=True).to_pandas()
+    return pd.read_parquet(target, memory_map=True)
+
+
+def load_pickups(path, cache_dir=DEFAULT_CACHE_DIR, fmt='feather', verbose=False):
+    """Load a raw pickup CSV, going through the columnar cache.
+
+    The first call for a given file content parses the CSV and writes the
+    cache (cold load); later calls memory-map the cache (warm load). Pass
+    ``cache_dir=None`` to skip the cache entirely; it is also skipped, with a
+    warning, when pyarrow is not installed.
+    """
+    start = time.perf_counter()
+    missing = _cache_engine_missing(fmt) if cache_dir is not None else None
+    if missing:
+        warnings.warn('%s is not installed, parsing %s without the %s cache (pip install uber-analysis[cache])'
+                      % (missing, path, fmt), RuntimeWarning, stacklevel=2)
+        cache_dir = None
+    if cache_dir is None:
+        frame = read_pickups(path)
+        if verbose:
+            print('parsed %s (%d rows) in %.2fs' % (path, len(frame), time.perf_counter() - start))
+        return frame
+
+    target = cache_path(path, cache_dir, fmt)
+    if os.path.exists(target):
+        frame = _read_cache(target, fmt)
+        if verbose:
+            print('warm load of %s from %s (%d rows) in %.2fs'
+                  % (path, target, len(frame), time.perf_counter() - start))
+        return frame
+
+    frame = read_pickups(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_cache(frame, target, fmt)
+    if verbose:
+        print('cold load of %s (%d rows) in %.2fs, cached to %s'
+              % (path, len(frame), time.perf_counter() - start, target))
+    return frame
@@ -0,0 +1,225 @@
+"""Live demand monitor over 15-minute bins.
+
+Pickups arrive one line at a time (raw CSV layout) from a tailed file or a
+local TCP socket. ``DemandMonitor`` keeps rolling counts per bin and base in a
+fixed-size ring buffer and, when a bin leaves the ring, compares its total with the
+weekday/slot baseline (cell 20's ``weekly_data`` mean, plus its spread).
+Memory is bounded: the ring, the latency histogram and the recent-alert queue
+all have fixed sizes.
+"""
+import asyncio
+import datetime
+import os
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from .ingest import DATETIME_FORMAT
+
+Alert = namedtuple('Alert', ['bin_start', 'rides', 'expected', 'zscore', 'kind'])
+
+MINUTES_PER_DAY = 24*60
+
+
+class Baseline:
+    """Mean and standard deviation of rides per (weekday, slot)."""
+
+    def __init__(self, mean, std, slot_minutes=15):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+        self.slot_minutes = slot_minutes
+
+    @classmethod
+    def from_cube(cls, cube):
+        """Baseline over the observed (non-zero) dates of each weekday/slot, like ``weekly_mean``."""
+        grid = cube.by_date_slot().astype(np.float64)
+        present = (grid > 0).astype(np.float64)
+        onehot = np.zeros((7, len(grid)))
+        onehot[cube.weekdays, np.arange(len(grid))] = 1
+        n = onehot @ present
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (onehot @ grid) / n
+            var = (onehot @ grid**2 - n*mean**2) / (n - 1)
+        std = np.sqrt(np.clip(var, 0, None))
+        std[n < 2] = np.nan
+        return cls(mean, std, cube.slot_minutes)
+
+    def expected(self, weekday, slot):
+        return self.mean[weekday, slot], self.std[weekday, slot]
+
+    def save(self, path):
+        np.savez(path, mean=self.mean, std=self.std, slot_minutes=self.slot_minutes)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f['mean'], f['std'], int(f['slot_minutes']))
+
+
+class LatencyHistogram:
+    """Per-event latency in log-spaced buckets from 100 ns to 10 s."""
+
+    def __init__(self):
+        self.edges = np.logspace(-7, 1, 161)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+        self.n = 0
+
+    def add(self, seconds):
+        self.counts[np.searchsorted(self.edges, seconds)] += 1
+        self.total += seconds
+        self.n += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        if not self.n:
+            return float('nan')
+        bucket = int(np.searchsorted(np.cumsum(self.counts), q*self.n))
+        return float(self.edges[min(bucket, len(self.edges) - 1)])
+
+    def summary(self):
+        if not self.n:
+            return 'no events'
+        return ('%d events, latency mean %.1fus, p50 <%.1fus, p99 <%.1fus, max %.1fus'
+                % (self.n, self.total / self.n*1e6, self.quantile(0.5)*1e6, self.quantile(0.99)*1e6, self.max*1e6))
+
+
+class DemandMonitor:
+    """Rolling counts per bin and base in a ring of ``window`` bins.
+
+    Events may arrive out of order by up to ``window - 1`` bins; older ones
+    are counted as late and dropped. A bin is evaluated only when it leaves
+    the ring, i.e. once it can no longer receive events, and bins that were
+    skipped are evaluated as having no rides, so an outage shows up as
+    ``drop`` alerts. ``flush`` evaluates the bins still in the ring at the end
+    of a finite stream. Bins whose total is
+    more than ``threshold`` standard deviations away from the baseline raise
+    an ``Alert``. The deviation is measured against the larger of the
+    baseline spread and the Poisson noise of the expected count.
+    """
+
+    def __init__(self, baseline, bases, window=8, threshold=3.0, on_alert=None, max_alerts=1000):
+        self.baseline = baseline
+        self.slot_minutes = baseline.slot_minutes
+        self.bases = {base: i for i, base in enumerate(bases)}
+        self.window = window
+        self.threshold = threshold
+        self.on_alert = on_alert
+        self.counts = np.zeros((window, len(self.bases) + 1), dtype=np.int64)
+        self.bin_ids = np.full(window, -1, dtype=np.int64)
+        self.latest = -1
+        #oldest bin not evaluated yet; None until the first event
+        self.pending = None
+        self.late = 0
+        self.alerts = deque(maxlen=max_alerts)
+        self.latency = LatencyHistogram()
+
+    def _bin_start(self, bin_id):
+        return datetime.datetime(1970, 1, 1) + datetime.timedelta(minutes=int(bin_id)*self.slot_minutes)
+
+    def _close(self, bin_id, rides):
+        """Compare a finished bin's ``rides`` with the baseline and raise an alert if needed."""
+        start = self._bin_start(bin_id)
+        slot = (start.hour*60 + start.minute) // self.slot_minutes
+        mean, std = self.baseline.expected(start.weekday(), slot)
+        if np.isnan(mean):
+            return
+        #a month of history gives only four or five samples per weekday/slot, so
+        #the spread is floored at the Poisson noise of the expected count
+        spread = max(std if std > 0 else 0.0, np.sqrt(mean))
+        zscore = (rides - mean) / spread if spread > 0 else 0.0
+        if abs(zscore) > self.threshold:
+            alert = Alert(start, rides, float(mean), float(zscore), 'surge' if zscore > 0 else 'drop')
+            self.alerts.append(alert)
+            if self.on_alert is not None:
+                self.on_alert(alert)
+
+    def _expire(self, until):
+        """Evaluate every pending bin before ``until``; bins that never held a pickup count as 0."""
+        if self.pending is None:
+            return
+        for bin_id in range(self.pending, until):
+            pos = bin_id % self.window
+            rides = int(self.counts[pos].sum()) if self.bin_ids[pos] == bin_id else 0
+            self._close(bin_id, rides)
+        self.pending = max(self.pending, until)
+
+    def flush(self):
+        """Evaluate the bins still in the ring, e.g. when a finite stream ends."""
+        self._expire(self.latest + 1)
+
+    def process(self, stamp, base):
+        """Count one pickup at ``stamp`` (a datetime) from ``base``."""
+        minutes = (stamp - datetime.datetime(1970, 1, 1)) // datetime.timedelta(minutes=1)
+        bin_id = minutes // self.slot_minutes
+        if bin_id > self.latest:
+            #bins pushed out of the ring can no longer change, so they are final now
+            self._expire(bin_id - self.window + 1)
+            #recycle the ring positions up to the new bin
+            for fresh in range(max(self.latest + 1, bin_id - self.window + 1), bin_id + 1):
+                pos = fresh % self.window
+                self.counts[pos] = 0
+                self.bin_ids[pos] = fresh
+            self.latest = bin_id
+        elif bin_id <= self.latest - self.window:
+            self.late += 1
+            return
+        if self.pending is None or bin_id < self.pending:
+            self.pending = bin_id
+        self.counts[bin_id % self.window, self.bases.get(base, len(self.bases))] += 1
+
+    def process_line(self, line):
+        start = time.perf_counter()
+        fields = line.strip().split(',')
+        if len(fields) < 4 or fields[0].startswith('Date'):
+            return
+        stamp = datetime.datetime.strptime(fields[0].strip('"'), DATETIME_FORMAT)
+        self.process(stamp, fields[3].strip('"'))
+        self.latency.add(time.perf_counter() - start)
+
+    def current(self):
+        """Counts per base of the newest bin, as a dict."""
+        if self.latest < 0:
+            return {}
+        row = self.counts[self.latest % self.window]
+        names = list(self.bases) + ['other']
+        return dict(zip(names, row.tolist()))
+
+    async def consume(self, lines):
+        async for line in lines:
+            self.process_line(line)
+        self.flush()
+
+
+async def tail_file(path, poll_interval=0.2, from_start=True, stop=None):
+    """Yield lines appended to ``path``, like ``tail -f``; ends when ``stop`` (an Event) is set."""
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        pending = ''
+        while True:
+            chunk = f.readline()
+            if chunk:
+                pending += chunk
+                if pending.endswith('\n'):
+                    yield pending
+                    pending = ''
+                continue
+            if stop is not None and stop.is_set():
+                return
+            await asyncio.sleep(poll_interval)
+
+
+async def serve_socket(monitor, host='127.0.0.1', port=9999):
+    """Accept newline-delimited pickups on a local TCP socket and feed them to ``monitor``."""
+    async def handle(reader, writer):
+        async for line in reader:
+            monitor.process_line(line.decode())
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,241 @@
+"""Summary pairplot and jointplot from precomputed 2D histograms (cells 81-82).
+
+``sns.pairplot(df, hue='Base')`` scatters every row in every pair of columns
+and fits a KDE per base on each diagonal. ``pair_histograms`` instead bins
+every column once, then counts every (pair, hue, x bin, y bin) combination
+with one ``np.bincount`` per chunk of rows, so the cost is O(rows x pairs)
+integer work and the drawing cost depends only on the number of bins.
+Off-diagonal panels are drawn as images whose colour is the hue mix of each
+cell and whose opacity grows with the log of its count; diagonals show the
+per-hue marginals.
+
+Columns whose values lie on a regular lattice (``Day``, ``WeekDay``,
+``Weekend``, the quarter-hour ``Time``, integer ``Rides``) get at most
+``bins`` bins, each holding the same whole number of lattice points, which
+avoids aliasing stripes; other columns get ``bins`` equal-width bins between
+their extremes.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BINS = 64
+DEFAULT_CHUNK_SIZE = 1000000
+#columns on a regular lattice of at most this many points get lattice-aligned bins
+MAX_LATTICE_POINTS = 4096
+#rows inspected when looking for such a lattice
+LATTICE_PROBE = 100000
+
+SummaryGrid = namedtuple('SummaryGrid', ['figure', 'axes', 'histograms'])
+
+
+def _column_edges(values, bins):
+    """Regular bin edges for one column, aligned to its lattice when its values sit on one."""
+    finite = values[np.isfinite(values)]
+    lo, hi = float(finite.min()), float(finite.max())
+    if hi == lo:
+        return np.array([lo - 0.5, lo + 0.5])
+    uniques = np.sort(pd.unique(finite[:LATTICE_PROBE]))
+    if len(uniques) <= MAX_LATTICE_POINTS:
+        step = np.diff(uniques).min()
+        points = int(round((hi - lo) / step)) + 1
+        on_lattice = np.allclose(np.mod(finite - lo + step/2, step), step/2, atol=step*1e-3)
+        if points <= MAX_LATTICE_POINTS and on_lattice:
+            #whole lattice points per bin, so no bin gets one more value than its neighbour
+            width = step*-(-points // bins)
+            count = -(-points*step // width)
+            return lo - step/2 + width*np.arange(int(count) + 1)
+    return np.linspace(lo, hi, bins + 1)
+
+
+def _bin_codes(values, edges):
+    """Bin index of each value on regular ``edges``; the upper edge falls in the last bin, NaN gives -1."""
+    n = len(edges) - 1
+    codes = np.floor((values - edges[0]) / (edges[1] - edges[0])).astype(np.int64)
+    codes = np.clip(codes, 0, n - 1)
+    codes[~np.isfinite(values)] = -1
+    return codes
+
+
+class PairHistograms:
+    """Per-hue 2D histograms of every column pair plus per-hue marginals.
+
+    ``pairs[h, p]`` is the (y bins x x bins) histogram of pair ``p`` (see
+    ``pair``) for hue level ``h``; ``marginals[h, v]`` holds column ``v``'s
+    counts. Both are padded with zeros to the largest bin count of any
+    column; ``pair`` and ``marginal`` return the unpadded views.
+    """
+
+    def __init__(self, variables, edges, hue_levels, pairs, marginals, hue=None):
+        self.variables = list(variables)
+        self.edges = edges
+        self.hue = hue
+        self.hue_levels = list(hue_levels)
+        self.pairs = pairs
+        self.marginals = marginals
+        self._pair_index = {(i, j): k for k, (i, j) in enumerate(
+            (i, j) for i in range(len(self.variables)) for j in range(i))}
+
+    @classmethod
+    def from_frame(cls, frame, vars=None, hue=None, bins=DEFAULT_BINS, chunk_size=DEFAULT_CHUNK_SIZE):
+        if vars is None:
+            vars = [c for c in frame.columns if c != hue and pd.api.types.is_numeric_dtype(frame[c])]
+        vars = list(vars)
+        columns = [frame[v].to_numpy(dtype=np.float64) for v in vars]
+        edges = [_column_edges(values, bins) for values in columns]
+        if hue is not None:
+            hue_codes, levels = pd.factorize(frame[hue], sort=True)
+            levels = list(levels.astype(str))
+        else:
+            hue_codes, levels = np.zeros(len(frame), dtype=np.int64), ['all']
+
+        n_vars, n_hue = len(vars), len(levels)
+        bins = max(len(e) - 1 for e in edges)
+        lower = [(i, j) for i in range(n_vars) for j in range(i)]
+        pair_counts = np.zeros(len(lower)*n_hue*bins*bins, dtype=np.int64)
+        marginal_counts = np.zeros(n_vars*n_hue*bins, dtype=np.int64)
+        for start in range(0, len(frame), chunk_size):
+            stop = start + chunk_size
+            codes = np.stack([_bin_codes(values[start:stop], e) for values, e in zip(columns, edges)])
+            h = np.asarray(hue_codes[start:stop], dtype=np.int64)
+            valid = h >= 0
+            #marginals: key (var, hue, bin)
+            keys = (np.arange(n_vars)[:, None]*n_hue + h)*bins + codes
+            keep = valid & (codes >= 0)
+            marginal_counts += np.bincount(keys[keep], minlength=len(marginal_counts))
+            if lower:
+                rows = np.array([i for i, _ in lower])
+                cols = np.array([j for _, j in lower])
+                #pairs: key (pair, hue, y bin, x bin), all pairs in one bincount
+                keys = ((np.arange(len(lower))[:, None]*n_hue + h)*bins + codes[rows])*bins + codes[cols]
+                keep = valid & (codes[rows] >= 0) & (codes[cols] >= 0)
+                pair_counts += np.bincount(keys[keep], minlength=len(pair_counts))
+
+        pairs = pair_counts.reshape(len(lower), n_hue, bins, bins).transpose(1, 0, 2, 3)
+        marginals = marginal_counts.reshape(n_vars, n_hue, bins).transpose(1, 0, 2)
+        return cls(vars, edges, levels, pairs, marginals, hue)
+
+    def pair(self, y, x):
+        """(hue, y bins, x bins) counts of variable ``y`` against variable ``x``."""
+        i, j = self.variables.index(y), self.variables.index(x)
+        ny, nx = len(self.edges[i]) - 1, len(self.edges[j]) - 1
+        if i > j:
+            return self.pairs[:, self._pair_index[i, j], :ny, :nx]
+        if i < j:
+            return self.pairs[:, self._pair_index[j, i], :nx, :ny].transpose(0, 2, 1)
+        raise ValueError('use marginal() for the diagonal')
+
+    def marginal(self, var):
+        """(hue, bins) counts of one variable."""
+        v = self.variables.index(var)
+        return self.marginals[:, v, :len(self.edges[v]) - 1]
+
+
+def pair_histograms(frame, vars=None, hue=None, bins=DEFAULT_BINS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """``PairHistograms`` of ``frame`` (numeric columns other than ``hue`` by default)."""
+    return PairHistograms.from_frame(frame, vars, hue, bins, chunk_size)
+
+
+def _palette(n, palette=None):
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import to_rgb
+
+    if palette is None:
+        palette = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    elif isinstance(palette, str):
+        palette = plt.get_cmap(palette)(np.linspace(0, 1, max(n, 2)))
+    return np.array([to_rgb(palette[k % len(palette)]) for k in range(n)])
+
+
+def hue_image(counts, colors):
+    """RGBA image of (hue, rows, cols) counts: hue-weighted colour, opacity by log count."""
+    total = counts.sum(axis=0)
+    image = np.zeros(total.shape + (4,))
+    occupied = total > 0
+    image[..., :3] = np.tensordot(counts, colors, axes=(0, 0)) / np.where(occupied, total, 1)[..., None]
+    if occupied.any():
+        image[..., 3] = np.log1p(total) / np.log1p(total.max())
+    return image
+
+
+def _draw_pair(ax, hist, y, x, colors):
+    ex, ey = hist.edges[hist.variables.index(x)], hist.edges[hist.variables.index(y)]
+    ax.imshow(hue_image(hist.pair(y, x), colors), origin='lower', aspect='auto',
+              extent=(ex[0], ex[-1], ey[0], ey[-1]), interpolation='nearest')
+
+
+def _draw_marginal(ax, hist, var, colors, vertical=False):
+    edges = hist.edges[hist.variables.index(var)]
+    counts = hist.marginal(var)
+    #common normalization, as seaborn's diagonal KDEs
+    density = counts / counts.sum() / np.diff(edges)
+    for level, color in zip(density, colors):
+        ax.stairs(level, edges, fill=True, color=color, alpha=0.1,
+                  orientation='horizontal' if vertical else 'vertical')
+        ax.stairs(level, edges, color=color, orientation='horizontal' if vertical else 'vertical')
+
+
+def _legend(fig, hist, colors):
+    from matplotlib.patches import Patch
+
+    if hist.hue is None:
+        return
+    handles = [Patch(color=c, label=level) for level, c in zip(hist.hue_levels, colors)]
+    fig.legend(handles=handles, title=hist.hue, loc='center right', frameon=False)
+
+
+def summary_pairplot(data, hue=None, vars=None, bins=DEFAULT_BINS, height=2.5, palette=None, histograms=None):
+    """Drop-in for ``sns.pairplot(data, hue=...)`` drawn from ``pair_histograms``.
+
+    Pass precomputed ``histograms`` to redraw without touching ``data``.
+    Returns a ``SummaryGrid`` of the figure, the axes array and the histograms.
+    """
+    import matplotlib.pyplot as plt
+
+    hist = histograms if histograms is not None else pair_histograms(data, vars, hue, bins)
+    n = len(hist.variables)
+    colors = _palette(len(hist.hue_levels), palette)
+    fig, axes = plt.subplots(n, n, figsize=(height*n + (1.5 if hist.hue else 0), height*n),
+                             squeeze=False, sharex='col')
+    for i, y in enumerate(hist.variables):
+        for j, x in enumerate(hist.variables):
+            ax = axes[i, j]
+            if i == j:
+                _draw_marginal(ax, hist, x, colors)
+                ax.set_yticks([])
+            else:
+                _draw_pair(ax, hist, y, x, colors)
+            ax.set_xlabel(x if i == n - 1 else '')
+            ax.set_ylabel(y if j == 0 and i != j else '')
+            if j and i != j:
+                ax.tick_params(labelleft=False)
+    _legend(fig, hist, colors)
+    fig.subplots_adjust(right=1 - 1.5/fig.get_figwidth() if hist.hue else 0.98, wspace=0.05, hspace=0.05)
+    return SummaryGrid(fig, axes, hist)
+
+
+def summary_jointplot(x, y, data, hue=None, bins=DEFAULT_BINS, height=6, palette=None, histograms=None):
+    """Drop-in for ``sns.jointplot(x=, y=, data=, hue=)``: joint image with marginal histograms."""
+    import matplotlib.pyplot as plt
+
+    hist = histograms if histograms is not None else pair_histograms(data, [x, y], hue, bins)
+    colors = _palette(len(hist.hue_levels), palette)
+    fig = plt.figure(figsize=(height, height))
+    grid = fig.add_gridspec(2, 2, width_ratios=(5, 1), height_ratios=(1, 5), wspace=0.05, hspace=0.05)
+    joint = fig.add_subplot(grid[1, 0])
+    top = fig.add_subplot(grid[0, 0], sharex=joint)
+    right = fig.add_subplot(grid[1, 1], sharey=joint)
+    _draw_pair(joint, hist, y, x, colors)
+    _draw_marginal(top, hist, x, colors)
+    _draw_marginal(right, hist, y, colors, vertical=True)
+    for ax in (top, right):
+        ax.axis('off')
+    joint.set_xlabel(x)
+    joint.set_ylabel(y)
+    if hist.hue is not None:
+        from matplotlib.patches import Patch
+
+        joint.legend(handles=[Patch(color=c, label=level) for level, c in zip(hist.hue_levels, colors)],
+                     title=hist.hue)
+    return SummaryGrid(fig, np.array([[top, None], [joint, right]]), hist)
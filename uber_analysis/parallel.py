@@ -0,0 +1,197 @@
+"""Partitioned multi-process execution of the aggregation stages.
+
+Two partitioning modes:
+
+* by row range (``parallel_aggregate``): the coded input columns are placed in
+  shared memory once, every worker attaches to them, bins its slice into a
+  partial count cube and radius-sweep counts, and writes its landmark
+  distances straight into a shared output matrix (``parallel_distances``
+  does only the distances);
+* by month (``parallel_file_cube``): every worker parses one monthly CSV and
+  returns a partial cube.
+
+Partial results are plain sums, so they are merged associatively
+(``CountCube.combine`` / addition of the radius counts).
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .cube import MINUTES_PER_DAY, CountCube, _base_codes, _minutes
+from .distance import haversine_matrix
+
+ParallelResult = namedtuple('ParallelResult', ['cube', 'distances', 'distance_data'])
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def partition_rows(n, parts):
+    """``parts`` contiguous ``(start, stop)`` row ranges covering ``range(n)``."""
+    bounds = np.linspace(0, n, max(1, min(parts, n or 1)) + 1).astype(np.int64)
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+class SharedArrays:
+    """Named NumPy arrays backed by ``multiprocessing.shared_memory``.
+
+    Use as a context manager in the parent; pass ``spec`` to workers, which
+    call ``attach``.
+    """
+
+    def __init__(self, arrays=None, empty=None):
+        self._blocks = []
+        self.arrays = {}
+        self.spec = {}
+        for name, values in (arrays or {}).items():
+            self._add(name, values.shape, values.dtype)[...] = values
+        for name, (shape, dtype) in (empty or {}).items():
+            self._add(name, shape, dtype)
+
+    def _add(self, name, shape, dtype):
+        dtype = np.dtype(dtype)
+        block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape))*dtype.itemsize))
+        self._blocks.append(block)
+        self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        self.spec[name] = (block.name, shape, dtype.str)
+        return self.arrays[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.arrays = {}
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+
+def attach(spec):
+    """Worker-side view of ``SharedArrays.spec``: returns ``(arrays, blocks)``; close the blocks when done."""
+    arrays, blocks = {}, []
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return arrays, blocks
+
+
+def _aggregate_slice(spec, start, stop, first_day, n_days, n_bases, slot_minutes, landmarks, radii):
+    arrays, blocks = attach(spec)
+    try:
+        minutes = arrays['minutes'][start:stop]
+        slots = MINUTES_PER_DAY // slot_minutes
+        flat = ((minutes // MINUTES_PER_DAY - first_day)*slots + (minutes % MINUTES_PER_DAY)//slot_minutes)*n_bases \
+            + arrays['base'][start:stop]
+        counts = np.bincount(flat, minlength=n_days*slots*n_bases)
+
+        within = None
+        if landmarks is not None:
+            out = arrays['distances'][start:stop]
+            haversine_matrix(arrays['lat'][start:stop], arrays['lon'][start:stop], landmarks, out=out)
+        if landmarks is not None and len(radii):
+            #per landmark: number of rows in this slice strictly closer than each radius
+            within = np.stack([np.searchsorted(np.sort(out[:, j]), radii, side='left')
+                               for j in range(out.shape[1])], axis=1)
+        return counts, within
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def _distance_slice(spec, start, stop, landmarks):
+    arrays, blocks = attach(spec)
+    try:
+        haversine_matrix(arrays['lat'][start:stop], arrays['lon'][start:stop], landmarks,
+                         out=arrays['distances'][start:stop])
+    finally:
+        del arrays
+        for block in blocks:
+            block.close()
+
+
+def parallel_distances(frame, landmarks, workers=None, parts=None, prefix='Distance '):
+    """``Distance <name>`` frame for a ``{name: (lat, lon)}`` dict, without the count cube."""
+    workers = workers or default_workers()
+    points = [tuple(c) for c in landmarks.values()]
+    inputs = {'lat': frame['Lat'].to_numpy(dtype=np.float64), 'lon': frame['Lon'].to_numpy(dtype=np.float64)}
+    with SharedArrays(inputs, {'distances': ((len(frame), len(points)), np.float64)}) as shared:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_distance_slice, shared.spec, start, stop, points)
+                       for start, stop in partition_rows(len(frame), parts or workers)]
+            for future in futures:
+                future.result()
+        return pd.DataFrame(shared.arrays['distances'].copy(), index=frame.index,
+                            columns=[prefix + name for name in landmarks])
+
+
+def parallel_aggregate(frame, workers=None, slot_minutes=15, landmarks=None, radii=None, parts=None):
+    """Count cube (and optionally landmark distances + radius counts) over ``workers`` processes.
+
+    ``landmarks`` is a ``{name: (lat, lon)}`` dict; when given, the result also
+    holds the ``Distance <name>`` frame and the radius-sweep counts for
+    ``radii`` (None when ``radii`` is None or empty, which skips the per-slice sorts).
+    ``parts`` defaults to one row range per worker.
+    """
+    workers = workers or default_workers()
+    minutes = _minutes(frame['Date/Time'])
+    base_codes, bases = _base_codes(frame['Base'])
+    days = minutes // MINUTES_PER_DAY
+    first_day, n_days = int(days.min()), int(days.max() - days.min()) + 1
+    n_bases = len(bases)
+
+    inputs = {'minutes': minutes, 'base': base_codes.astype(np.int64)}
+    empty = {}
+    points = None
+    if landmarks is not None:
+        points = [tuple(c) for c in landmarks.values()]
+        radii = np.atleast_1d(np.asarray([] if radii is None else radii, dtype=np.float64))
+        inputs['lat'] = frame['Lat'].to_numpy(dtype=np.float64)
+        inputs['lon'] = frame['Lon'].to_numpy(dtype=np.float64)
+        empty['distances'] = ((len(frame), len(points)), np.float64)
+
+    ranges = partition_rows(len(frame), parts or workers)
+    with SharedArrays(inputs, empty) as shared:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_aggregate_slice, shared.spec, start, stop, first_day, n_days, n_bases,
+                                   slot_minutes, points, radii) for start, stop in ranges]
+            partials = [f.result() for f in futures]
+        counts = sum(p[0] for p in partials)
+        distances = distance_data = None
+        if landmarks is not None:
+            columns = ['Distance ' + name for name in landmarks]
+            distances = pd.DataFrame(shared.arrays['distances'].copy(), index=frame.index, columns=columns)
+            if len(radii):
+                distance_data = pd.DataFrame(sum(p[1] for p in partials), index=pd.Index(radii, name='radius'),
+                                             columns=list(landmarks))
+
+    slots = MINUTES_PER_DAY // slot_minutes
+    start = pd.Timestamp(first_day*MINUTES_PER_DAY, unit='m')
+    cube = CountCube(counts.reshape(n_days, slots, n_bases), start, bases, slot_minutes)
+    return ParallelResult(cube, distances, distance_data)
+
+
+def _file_cube(path, slot_minutes):
+    from .ingest import read_pickups
+
+    return CountCube.from_frame(read_pickups(path), slot_minutes=slot_minutes)
+
+
+def parallel_file_cube(pattern, workers=None, slot_minutes=15):
+    """One worker per monthly file; the partial cubes are combined at the end."""
+    from .streaming import monthly_files
+
+    files = monthly_files(pattern)
+    with ProcessPoolExecutor(max_workers=workers or default_workers()) as pool:
+        cubes = list(pool.map(_file_cube, files, [slot_minutes]*len(files)))
+    return CountCube.combine(cubes)
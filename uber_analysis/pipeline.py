@@ -0,0 +1,393 @@
+"""The notebook's analysis as a sequence of named stages.
+
+Every stage is a function of a ``Run`` that returns a dict of named results.
+The reserved ``'rows'`` entry is the number of input rows the stage consumed;
+it goes into the stage's ``StageRecord`` (and the cache) rather than the results.
+Stages import the libraries they need inside their body, so running only the
+compute stages never imports matplotlib, seaborn or folium. Plot stages are
+skipped when the run is headless.
+
+With a ``StageCache`` attached to the run, each cacheable stage's outputs are
+stored under a key derived from the input file hash, the stage's parameters,
+its upstream keys and a fingerprint of the package source, so editing any
+stage or the code it calls invalidates the cached outputs. A stage whose key is cached is loaded instead of run,
+and its dependencies are not even materialized.
+"""
+import os
+from collections import OrderedDict, namedtuple
+
+from .distance import LANDMARKS
+from .profiling import instrument
+
+
+class SkipStage(Exception):
+    """Raised by a stage whose input cannot support it; the run logs the reason and goes on."""
+
+
+Stage = namedtuple('Stage', ['name', 'func', 'requires', 'params', 'plot', 'cache'])
+
+STAGES = OrderedDict()
+
+#results written to the output directory
+PUBLISHED = {'binned_counts', 'weekly_data', 'daywise', 'weekly_mean', 'distance_data',
+             'landmark_counts', 'cell_counts', 'ttestvals', 'modeling_frame', 'forecast_scores', 'forecast',
+             'hotspots'}
+
+DEFAULT_PARAMS = {
+    'slot_minutes': 15,
+    'landmarks': dict(LANDMARKS),
+    'radius_start': 0.1,
+    'radius_stop': 5.1,
+    'radius_step': 0.1,
+    'cell_deg': 0.005,
+    #{name: (lat, lon)} venues for the proximity stage; None means the two landmarks above
+    'landmark_table': None,
+    #precision of the integer geohash cells (35 bits = 7 geohash characters)
+    'geocell_bits': 35,
+    #'ridge' or 'hgb' (needs scikit-learn), backtested with nightly refits over the last holdout days
+    'forecast_model': 'ridge',
+    'holdout_days': 7,
+    #grid DBSCAN over Lat/Lon per BinnedHour window
+    'hotspot_eps_miles': 0.25,
+    'hotspot_min_samples': 20,
+}
+
+
+def stage(name, requires=(), params=(), plot=False, cache=True):
+    """Register ``func`` as a stage; ``params`` are the run parameters its output depends on."""
+    def register(func):
+        STAGES[name] = Stage(name, func, tuple(requires), tuple(params), plot, cache and not plot)
+        return func
+    return register
+
+
+class Run:
+    """Inputs, parameters and accumulated results of one pipeline run."""
+
+    def __init__(self, input_path, output_dir=None, params=None, headless=True, cache_dir=None,
+                 stage_cache=None, workers=1):
+        self.input_path = input_path
+        #worker processes for the partitioned stages; does not change results, so it is not a cache parameter
+        self.workers = workers
+        self.output_dir = output_dir
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.headless = headless
+        self.cache_dir = cache_dir
+        self.stage_cache = stage_cache
+        self.results = {}
+        self.keys = {}
+        self.records = {}
+        #None, 'cprofile' or 'sample': profile every computed stage (see profiling.instrument)
+        self.profiler = None
+        self._input_hash = None
+
+    @property
+    def input_hash(self):
+        if self._input_hash is None:
+            from .ingest import file_hash
+            self._input_hash = file_hash(self.input_path)
+        return self._input_hash
+
+    def key(self, name):
+        """Cache key of stage ``name`` (depends on all of its upstream keys)."""
+        if name not in self.keys:
+            from . import __version__
+            from .cache import code_fingerprint, stage_key
+
+            current = STAGES[name]
+            upstream = [self.key(dep) for dep in current.requires]
+            params = {p: self.params[p] for p in current.params}
+            version = '%s+%s' % (__version__, code_fingerprint(os.path.dirname(__file__)))
+            self.keys[name] = stage_key(name, self.input_hash, params, upstream, version)
+        return self.keys[name]
+
+    def __getitem__(self, key):
+        return self.results[key]
+
+    def output_file(self, name):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, name)
+
+
+def resolve(names):
+    """``names`` plus everything they depend on, in execution order."""
+    unknown = [n for n in names if n not in STAGES]
+    if unknown:
+        raise KeyError('unknown stage(s): %s (available: %s)' % (', '.join(unknown), ', '.join(STAGES)))
+    needed = set()
+
+    def visit(name):
+        if name not in needed:
+            needed.add(name)
+            for dep in STAGES[name].requires:
+                visit(dep)
+    for name in names:
+        visit(name)
+    return [name for name in STAGES if name in needed]
+
+
+def _save(run, name, value):
+    import pandas as pd
+
+    if run.output_dir is None:
+        return
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        value.to_csv(run.output_file(name + '.csv'))
+
+
+def _materialize(run, name, done, log):
+    if name in done:
+        return
+    done.add(name)
+    current = STAGES[name]
+    cache = run.stage_cache if current.cache else None
+    #the key hashes the input file, which is not part of any stage's time
+    key = run.key(name) if cache is not None else None
+    with instrument(name) as record:
+        outputs = cache.get(key) if cache is not None else None
+    if outputs is not None:
+        status = 'cached'
+        record.cached = True
+    else:
+        for dep in current.requires:
+            _materialize(run, dep, done, log)
+        try:
+            with instrument(name, run.profiler) as record:
+                outputs = current.func(run) or {}
+        except SkipStage as e:
+            log('%s (skipped): %s' % (name, e))
+            return
+        if cache is not None:
+            cache.put(key, outputs)
+        status = 'computed'
+    outputs = dict(outputs)
+    record.rows = outputs.pop('rows', None)
+    run.results.update(outputs)
+    run.records[name] = record
+    log('%s (%s): %s' % (name, status, ', '.join(outputs) or 'done'))
+
+
+def run_pipeline(run, names=None, log=print):
+    """Run the requested stages and their dependencies.
+
+    By default every cacheable non-plot stage is requested; the dependencies
+    of a stage are only run when the stage itself is not cached.
+    """
+    if names is None:
+        names = [s.name for s in STAGES.values() if s.cache]
+    done = set()
+    for name in resolve(names):
+        if STAGES[name].plot and run.headless:
+            log('skipping %s (headless)' % name)
+            done.add(name)
+            continue
+        if name in names:
+            _materialize(run, name, done, log)
+    for key, value in run.results.items():
+        if key in PUBLISHED:
+            _save(run, key, value)
+    if run.stage_cache is not None:
+        log(run.stage_cache.report())
+    return run
+
+
+@stage('ingest', cache=False)
+def ingest(run):
+    from .ingest import load_pickups
+
+    uber_data = load_pickups(run.input_path, cache_dir=run.cache_dir)
+    return {'uber_data': uber_data, 'rows': len(uber_data)}
+
+
+@stage('binning', requires=['ingest'], params=['slot_minutes'])
+def binning(run):
+    binned = run['uber_data']['Date/Time'].dt.floor('%dmin' % run.params['slot_minutes'])
+    return {'binned_hour': binned.rename('BinnedHour'),
+            'binned_counts': binned.value_counts().sort_index().rename('Rides'), 'rows': len(binned)}
+
+
+@stage('cube', requires=['ingest'], params=['slot_minutes'])
+def cube(run):
+    from .cube import CountCube
+
+    if run.workers > 1:
+        from .parallel import parallel_aggregate
+        counts = parallel_aggregate(run['uber_data'], run.workers, run.params['slot_minutes']).cube
+    else:
+        counts = CountCube.from_frame(run['uber_data'], slot_minutes=run.params['slot_minutes'])
+    return {'cube': counts, 'weekly_data': counts.weekly_data(), 'daywise': counts.daywise(),
+            'weekly_mean': counts.weekly_mean(), 'rows': len(run['uber_data'])}
+
+
+@stage('distance', requires=['ingest'], params=['landmarks', 'radius_start', 'radius_stop', 'radius_step'])
+def distance(run):
+    import numpy as np
+    from .distance import landmark_distances
+    from .proximity import LandmarkIndex
+
+    uber_data = run['uber_data']
+    landmarks = run.params['landmarks']
+    if run.workers > 1:
+        from .parallel import parallel_distances
+        dist = parallel_distances(uber_data, landmarks, run.workers)
+    else:
+        dist = landmark_distances(uber_data, landmarks)
+    index = LandmarkIndex(uber_data['Lat'].to_numpy(), uber_data['Lon'].to_numpy())
+    for name, coords in landmarks.items():
+        index.add_landmark(name, coords, distances=dist['Distance ' + name])
+    radii = np.arange(run.params['radius_start'], run.params['radius_stop'], run.params['radius_step'])
+    distance_data = index.count_within(radii).add_prefix('CloserTo')
+    return {'distances': dist, 'landmark_index': index, 'distance_data': distance_data, 'rows': len(uber_data)}
+
+
+@stage('proximity', requires=['ingest'],
+       params=['landmarks', 'landmark_table', 'radius_start', 'radius_stop', 'radius_step'])
+def proximity(run):
+    import numpy as np
+    from .landmarks import ProximityEngine
+
+    uber_data = run['uber_data']
+    engine = ProximityEngine(run.params['landmark_table'] or run.params['landmarks'])
+    radii = np.arange(run.params['radius_start'], run.params['radius_stop'], run.params['radius_step'])
+    return {'nearest_landmark': engine.nearest(uber_data['Lat'].to_numpy(), uber_data['Lon'].to_numpy()),
+            'landmark_counts': engine.counts_within(uber_data['Lat'].to_numpy(), uber_data['Lon'].to_numpy(), radii),
+            'rows': len(uber_data)}
+
+
+@stage('geocell', requires=['ingest', 'binning'], params=['geocell_bits'])
+def geocell(run):
+    from .geocell import cell_counts, encode
+
+    uber_data = run['uber_data']
+    cells = encode(uber_data['Lat'].to_numpy(), uber_data['Lon'].to_numpy(), run.params['geocell_bits'])
+    return {'geocells': cells, 'cell_counts': cell_counts(cells, run['binned_hour']), 'rows': len(cells)}
+
+
+@stage('ttest', requires=['cube'])
+def ttest(run):
+    import numpy as np
+    from .stats import weekday_weekend_ttest
+
+    #rows are the (date, slot) samples with rides, the non-NaN entries of the normalized matrix
+    return {'ttestvals': weekday_weekend_ttest(run['cube']), 'rows': int(np.count_nonzero(run['cube'].by_date_slot()))}
+
+
+@stage('modeling', requires=['cube'])
+def modeling(run):
+    from .features import weekend_flag
+
+    frame = run['cube'].modeling_frame()
+    frame['Weekend'] = weekend_flag(frame['WeekDay'])
+    return {'modeling_frame': frame, 'rows': len(frame)}
+
+
+@stage('forecast', requires=['cube'], params=['forecast_model', 'holdout_days'])
+def forecast(run):
+    from .forecast import backtest, min_history
+
+    days, slots, bases = run['cube'].counts.shape
+    history = min_history(run['cube'])
+    needed = history + run.params['holdout_days'] + 1
+    if days < needed:
+        raise SkipStage('needs at least %d days of history for a %d-day holdout, got %d'
+                        % (needed, run.params['holdout_days'], days))
+    forecaster, table = backtest(run['cube'], run.params['forecast_model'], run.params['holdout_days'])
+    #the backtest has already folded in every held-out day; rows are its (day, slot, base) feature rows
+    return {'forecast_scores': table, 'forecast': forecaster.forecast(run['cube']),
+            'rows': (days - history)*slots*bases}
+
+
+@stage('heatmap', requires=['ingest', 'binning'], params=['cell_deg'])
+def heatmap(run):
+    from .heatmaps import heatmap_frames, heatmap_points
+
+    uber_data = run['uber_data']
+    cell_deg = run.params['cell_deg']
+    return {'heatmap_points': heatmap_points(uber_data['Lat'], uber_data['Lon'], cell_deg=cell_deg),
+            'heatmap_frames': heatmap_frames(uber_data, cell_deg=cell_deg, times=run['binned_hour']),
+            'rows': len(uber_data)}
+
+
+@stage('hotspots', requires=['ingest', 'binning'], params=['hotspot_eps_miles', 'hotspot_min_samples'])
+def hotspots(run):
+    from .hotspots import hotspots as find_hotspots
+
+    found = find_hotspots(run['uber_data'], run.params['hotspot_eps_miles'], run.params['hotspot_min_samples'],
+                          times=run['binned_hour'], workers=run.workers)
+    return {'hotspots': found, 'rows': len(run['uber_data'])}
+
+
+@stage('plots', requires=['ingest', 'binning', 'cube', 'ttest', 'modeling'], plot=True)
+def plots(run):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from .kde import histkde_plot
+    from .pairplot import summary_jointplot, summary_pairplot
+    from .raster import density_plot
+
+    uber_data = run['uber_data']
+    written = {}
+
+    def save(name):
+        path = run.output_file(name + '.png')
+        plt.savefig(path, bbox_inches='tight')
+        plt.close('all')
+        written[name] = path
+
+    plt.figure(figsize=(15, 8))
+    run['binned_counts'].plot(c='darkblue', alpha=0.8)
+    plt.title('Uber Rides every 15 mins')
+    save('rides_per_slot')
+
+    plt.figure(figsize=(15, 15))
+    sns.heatmap(run['weekly_mean'], cmap='Greens')
+    plt.title('Heatmap of average rides in time vs day grid')
+    save('weekly_heatmap')
+
+    plt.figure(figsize=(10, 10))
+    histkde_plot(uber_data['Lat'], color='r', label='latitude')
+    plt.legend(loc='upper right')
+    plt.xlabel('Latitude')
+    plt.twiny()
+    histkde_plot(uber_data['Lon'], color='g', label='longitude')
+    plt.legend(loc='upper left')
+    plt.xlabel('Longitude')
+    plt.title('Distribution of Latitude and Longitude')
+    save('lat_lon_distribution')
+
+    plt.figure(figsize=(12, 12))
+    density_plot(uber_data['Lat'], uber_data['Lon'])
+    plt.xlabel('Latitude')
+    plt.ylabel('Longitude')
+    save('lat_lon_density')
+
+    plt.figure(figsize=(16, 16))
+    run['ttestvals']['statistic'].plot(kind='barh', color='red', ax=plt.gca())
+    plt.title('Bar plot of tstatistic')
+    save('ttest_statistic')
+
+    grid = summary_pairplot(run['modeling_frame'], hue='Base')
+    save('modeling_pairplot')
+
+    #the jointplot reuses the pairplot's histograms
+    summary_jointplot(x='Rides', y='Time', data=None, histograms=grid.histograms)
+    save('rides_time_jointplot')
+    return {'figures': written, 'rows': len(uber_data)}
+
+
+@stage('maps', requires=['heatmap'], plot=True)
+def maps(run):
+    from .heatmaps import heatmap_with_time
+    import folium
+    from folium.plugins import HeatMap
+
+    location = next(iter(run.params['landmarks'].values()))
+    uber_map = folium.Map(location=location, zoom_start=10)
+    HeatMap(run['heatmap_points'], radius=10).add_to(uber_map)
+    static = run.output_file('heatmap.html')
+    uber_map.save(static)
+    timed = run.output_file('heatmap_with_time.html')
+    heatmap_with_time(run['heatmap_frames'], location).save(timed)
+    return {'maps': {'heatmap': static, 'heatmap_with_time': timed}, 'rows': len(run['heatmap_points'])}
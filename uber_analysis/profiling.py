@@ -0,0 +1,194 @@
+"""Instrumentation for pipeline stages: time, memory and optional profiles.
+
+``track_memory`` samples the process RSS from a background thread while the
+wrapped block runs and records the start and peak values, so a stage that
+briefly doubles the frame (e.g. with ``.copy()``) shows up even though the
+copy is freed again before the stage returns.
+
+``instrument`` wraps a stage and records wall time, CPU time, peak memory and
+rows processed in a ``StageRecord``. With ``profiler='cprofile'`` or
+``profiler='sample'`` it also keeps a cProfile / stack-sampling profile that
+``write_profile`` dumps as a ``.prof`` file or as folded stacks (the input
+format of flamegraph.pl and speedscope).
+"""
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+DEFAULT_INTERVAL = 0.005
+
+
+def current_rss():
+    """Resident set size of this process in bytes."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        #no way to read the current value, fall back to the lifetime maximum
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak*1024
+
+
+class MemoryUsage:
+    """Start, end and peak RSS (bytes) observed while a block ran."""
+
+    def __init__(self, start):
+        self.start = start
+        self.end = start
+        self.peak = start
+
+    @property
+    def peak_delta(self):
+        return self.peak - self.start
+
+    def __repr__(self):
+        return 'MemoryUsage(start=%.1fMB, peak=%.1fMB, end=%.1fMB)' % (
+            self.start / 2**20, self.peak / 2**20, self.end / 2**20)
+
+
+@contextmanager
+def track_memory(interval=DEFAULT_INTERVAL):
+    """Context manager yielding a ``MemoryUsage`` that is filled in on exit."""
+    usage = MemoryUsage(current_rss())
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            usage.peak = max(usage.peak, current_rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield usage
+    finally:
+        stop.set()
+        sampler.join()
+        usage.end = current_rss()
+        usage.peak = max(usage.peak, usage.end)
+
+
+def memory_table(usages):
+    """Text table of ``{stage: MemoryUsage}``."""
+    lines = ['%-12s %10s %10s %10s' % ('stage', 'start MB', 'peak MB', '+peak MB')]
+    for name, usage in usages.items():
+        lines.append('%-12s %10.1f %10.1f %10.1f' % (name, usage.start / 2**20, usage.peak / 2**20,
+                                                     usage.peak_delta / 2**20))
+    return '\n'.join(lines)
+
+
+class StackSampler:
+    """Samples the stack of one thread at a fixed interval into folded-stack counts."""
+
+    def __init__(self, thread_id=None, interval=0.001):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return '\n'.join('%s %d' % item for item in self.stacks.most_common())
+
+
+class StageRecord:
+    """Wall/CPU seconds, memory and rows of one stage run."""
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.memory = None
+        self.rows = None
+        self.cached = False
+        self.profile = None
+
+    def __repr__(self):
+        return 'StageRecord(%r, wall=%.3fs, cpu=%.3fs)' % (self.name, self.wall, self.cpu)
+
+
+@contextmanager
+def instrument(name, profiler=None):
+    """Context manager yielding a ``StageRecord`` that is filled in on exit.
+
+    ``profiler`` is None, ``'cprofile'`` or ``'sample'``. The caller sets
+    ``record.rows`` (and ``record.cached``) itself.
+    """
+    record = StageRecord(name)
+    if profiler == 'cprofile':
+        import cProfile
+        record.profile = cProfile.Profile()
+    elif profiler == 'sample':
+        record.profile = StackSampler()
+    elif profiler is not None:
+        raise ValueError("profiler must be None, 'cprofile' or 'sample', got %r" % profiler)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    with track_memory() as usage:
+        if record.profile is not None:
+            (record.profile.enable if profiler == 'cprofile' else record.profile.start)()
+        try:
+            yield record
+        finally:
+            if record.profile is not None:
+                (record.profile.disable if profiler == 'cprofile' else record.profile.stop)()
+            record.wall = time.perf_counter() - wall
+            record.cpu = time.process_time() - cpu
+    record.memory = usage
+
+
+def write_profile(record, directory):
+    """Dump ``record``'s profile to ``directory``; returns the file path."""
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(record.profile, StackSampler):
+        path = os.path.join(directory, record.name + '.folded')
+        with open(path, 'w') as f:
+            f.write(record.profile.folded() + '\n')
+    else:
+        path = os.path.join(directory, record.name + '.prof')
+        record.profile.dump_stats(path)
+    return path
+
+
+def slowest(records):
+    computed = [r for r in records.values() if not r.cached]
+    return max(computed, key=lambda r: r.wall) if computed else None
+
+
+def stage_table(records):
+    """Text table of ``{stage: StageRecord}``."""
+    lines = ['%-12s %8s %8s %10s %10s %11s' % ('stage', 'wall s', 'cpu s', 'peak MB', '+peak MB', 'rows')]
+    for record in records.values():
+        memory = record.memory
+        rows = '-' if record.rows is None else '%d' % record.rows
+        lines.append('%-12s %8.3f %8.3f %10.1f %10.1f %11s%s' % (
+            record.name, record.wall, record.cpu, memory.peak / 2**20, memory.peak_delta / 2**20, rows,
+            ' (cached)' if record.cached else ''))
+    return '\n'.join(lines)
@@ -0,0 +1,83 @@
+"""Radius queries around landmarks ("how many pickups within r miles of L").
+
+Cells 33-36 scan the distance columns once per threshold. ``LandmarkIndex``
+sorts each landmark's distances once, after which any vector of radii is
+answered with a single ``searchsorted``.
+"""
+import numpy as np
+import pandas as pd
+
+from .distance import haversine_matrix
+
+
+class LandmarkIndex:
+    """Sorted per-landmark distances over a fixed set of pickup coordinates.
+
+    Landmarks can be added at any time; only the new landmark's distances are
+    computed. ``save``/``load`` persist the index so later runs skip the
+    distance pass altogether.
+    """
+
+    def __init__(self, lat, lon, landmarks=None):
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        if self.lat.shape != self.lon.shape:
+            raise ValueError('lat and lon must have the same length')
+        self.landmarks = {}
+        self._sorted = {}
+        for name, coords in (landmarks or {}).items():
+            self.add_landmark(name, coords)
+
+    @classmethod
+    def from_frame(cls, frame, landmarks=None):
+        return cls(frame['Lat'].to_numpy(), frame['Lon'].to_numpy(), landmarks)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __contains__(self, name):
+        return name in self._sorted
+
+    def add_landmark(self, name, coords, distances=None):
+        """Register ``name`` at ``(lat, lon)``; pass ``distances`` to reuse a precomputed column."""
+        if distances is None:
+            distances = haversine_matrix(self.lat, self.lon, [coords])[:, 0]
+        else:
+            distances = np.array(distances, dtype=np.float64)
+            if distances.shape != self.lat.shape:
+                raise ValueError('distances must have one value per pickup')
+        distances.sort()
+        self.landmarks[name] = tuple(coords)
+        self._sorted[name] = distances
+        return self
+
+    def remove_landmark(self, name):
+        del self.landmarks[name]
+        del self._sorted[name]
+
+    def count_within(self, radii, landmarks=None):
+        """Pickups strictly closer than each radius, one column per landmark.
+
+        Equivalent to ``(distances < r).sum()`` for every ``r`` in ``radii``,
+        which is what cell 34 computes.
+        """
+        radii = np.atleast_1d(np.asarray(radii, dtype=np.float64))
+        names = list(self._sorted) if landmarks is None else list(landmarks)
+        counts = {name: np.searchsorted(self._sorted[name], radii, side='left') for name in names}
+        return pd.DataFrame(counts, index=pd.Index(radii, name='radius'))
+
+    def save(self, path):
+        names = list(self._sorted)
+        np.savez(path, lat=self.lat, lon=self.lon,
+                 names=np.array(names, dtype=str),
+                 coords=np.array([self.landmarks[n] for n in names], dtype=np.float64).reshape(-1, 2),
+                 **{'d_%d' % i: self._sorted[n] for i, n in enumerate(names)})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            index = cls(f['lat'], f['lon'])
+            for i, (name, coords) in enumerate(zip(f['names'], f['coords'])):
+                index.landmarks[str(name)] = tuple(float(c) for c in coords)
+                index._sorted[str(name)] = f['d_%d' % i]
+        return index
@@ -0,0 +1,50 @@
+"""Rasterized density scatter for large point sets (cell 27).
+
+``sns.scatterplot`` creates one marker per pickup; here the points are
+accumulated into a pixel-sized count buffer with ``np.bincount`` and shown with
+``imshow``, so drawing cost depends on the image size, not the point count.
+"""
+import numpy as np
+
+
+def raster_extent(x, y):
+    return float(np.min(x)), float(np.max(x)), float(np.min(y)), float(np.max(y))
+
+
+def density_raster(x, y, width=800, height=800, extent=None):
+    """``(height, width)`` array of point counts per pixel; row 0 is the lowest ``y``.
+
+    Points outside ``extent = (x_min, x_max, y_min, y_max)`` are dropped.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x_min, x_max, y_min, y_max = extent or raster_extent(x, y)
+    #avoid a zero-width axis when all points share a coordinate
+    x_span = (x_max - x_min) or 1.0
+    y_span = (y_max - y_min) or 1.0
+
+    #floor, not truncation toward zero, so points just below x_min/y_min fall outside
+    col = np.floor((x - x_min) * (width / x_span)).astype(np.int64)
+    row = np.floor((y - y_min) * (height / y_span)).astype(np.int64)
+    #points exactly on the upper edge belong to the last pixel
+    col[x == x_max] = width - 1
+    row[y == y_max] = height - 1
+    inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    flat = row[inside]*width + col[inside]
+    return np.bincount(flat, minlength=width*height).reshape(height, width)
+
+
+def density_plot(x, y, width=800, height=800, extent=None, ax=None, cmap='Blues', log=True, **kwargs):
+    """Draw ``density_raster`` with ``imshow`` (log colour scale by default)."""
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm
+
+    extent = extent or raster_extent(x, y)
+    counts = density_raster(x, y, width, height, extent).astype(np.float64)
+    counts[counts == 0] = np.nan
+    if ax is None:
+        ax = plt.gca()
+    norm = LogNorm() if log else None
+    image = ax.imshow(counts, origin='lower', extent=extent, aspect='auto', cmap=cmap,
+                      norm=norm, interpolation='nearest', **kwargs)
+    return image
@@ -0,0 +1,99 @@
+"""Memory-compact layout of the pickup frame.
+
+After cells 6-41 ``uber_data`` holds Python ``date``/``time`` objects, an
+object ``Base``, float64 coordinates/distances and a constant ``Weight``
+column. ``compact_pickups`` keeps the same information in:
+
+* ``Date/Time``   datetime64 (``BinnedHour`` is recomputed from it on demand)
+* ``DateCode``    int16 days since ``frame.attrs['start']``
+* ``Slot``        slot of the day (0-95 for 15-minute slots), int8, or int16 for
+                  slots shorter than 12 minutes
+* ``Day``/``Base`` categoricals
+* ``Lat``/``Lon`` and ``Distance *`` float32
+
+Constant columns such as ``Weight`` are recorded in ``frame.attrs`` and
+materialized only when asked for with ``column``.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .cube import DAY_NAMES, MINUTES_PER_DAY
+
+DERIVED_COLUMNS = ['BinnedHour', 'Date', 'Time']
+
+
+def compact_pickups(frame, slot_minutes=15, start=None):
+    """Compact copy of ``frame``; derived and constant columns are dropped."""
+    stamps = frame['Date/Time']
+    minutes = np.asarray(stamps.to_numpy(), dtype='datetime64[m]').astype(np.int64)
+    days = minutes // MINUTES_PER_DAY
+    first = int(days.min()) if start is None else int(pd.Timestamp(start).value // (86400*10**9))
+    if len(days) and days.max() - first > np.iinfo(np.int16).max:
+        raise ValueError('date range too long for int16 date codes')
+
+    slots = MINUTES_PER_DAY // slot_minutes
+    slot_dtype = np.int8 if slots <= np.iinfo(np.int8).max + 1 else np.int16
+    out = pd.DataFrame({
+        'Date/Time': stamps.to_numpy(),
+        'Lat': frame['Lat'].to_numpy(dtype=np.float32),
+        'Lon': frame['Lon'].to_numpy(dtype=np.float32),
+        'Base': frame['Base'].astype('category').array,
+        'DateCode': (days - first).astype(np.int16),
+        'Slot': ((minutes % MINUTES_PER_DAY) // slot_minutes).astype(slot_dtype),
+        'Day': pd.Categorical.from_codes(stamps.dt.weekday.to_numpy(), categories=DAY_NAMES, ordered=True),
+    }, index=frame.index)
+    for name in frame.columns:
+        if name.startswith('Distance '):
+            out[name] = frame[name].to_numpy(dtype=np.float32)
+
+    constants = {}
+    for name in frame.columns:
+        if name in out.columns or name in DERIVED_COLUMNS:
+            continue
+        values = frame[name]
+        if len(values) and values.nunique(dropna=False) == 1:
+            constants[name] = values.iloc[0]
+        else:
+            out[name] = values
+    out.attrs.update(start=pd.Timestamp(first*MINUTES_PER_DAY, unit='m'), slot_minutes=slot_minutes,
+                     constants=constants)
+    return out
+
+
+def set_constant(frame, name, value):
+    """Record a constant column without materializing it."""
+    frame.attrs.setdefault('constants', {})[name] = value
+    return frame
+
+
+def column(frame, name):
+    """Values of ``name``: a stored column, a virtual constant or a derived column.
+
+    Constants come back as a read-only broadcast view, so they cost no memory.
+    """
+    if name in frame.columns:
+        return frame[name]
+    constants = frame.attrs.get('constants', {})
+    if name in constants:
+        return np.broadcast_to(np.asarray(constants[name]), (len(frame),))
+    slot_minutes = frame.attrs.get('slot_minutes', 15)
+    if name == 'BinnedHour':
+        return frame['Date/Time'].dt.floor('%dmin' % slot_minutes).rename(name)
+    if name == 'Date':
+        dates = pd.Timestamp(frame.attrs['start']) + pd.to_timedelta(frame['DateCode'].to_numpy(), unit='D')
+        return pd.Series(dates.date, index=frame.index, name=name)
+    if name == 'Time':
+        times = np.array([datetime.time(m // 60, m % 60) for m in range(0, MINUTES_PER_DAY, slot_minutes)])
+        return pd.Series(times[frame['Slot'].to_numpy()], index=frame.index, name=name)
+    raise KeyError(name)
+
+
+def memory_report(before, after):
+    """Per-column ``memory_usage(deep=True)`` of two frames, with a bytes-per-row total."""
+    report = pd.DataFrame({'before': before.memory_usage(deep=True, index=False),
+                           'after': after.memory_usage(deep=True, index=False)}).fillna(0).astype(np.int64)
+    report.loc['total'] = report.sum()
+    report.loc['bytes/row'] = (report.loc['total'] / np.array([max(len(before), 1), max(len(after), 1)])).round(1)
+    return report
@@ -0,0 +1,84 @@
+"""Batched weekday-vs-weekend t-tests over all time slots.
+
+Cell 64 calls ``scipy.stats.ttest_ind`` once per slot from a
+``groupby('Time').apply``. Here the normalized rides are laid out as a
+(days x slots) matrix and every slot's t-statistic and p-value are computed
+in one vectorized pass.
+"""
+import numpy as np
+import pandas as pd
+from scipy.special import stdtr
+
+
+def _moments(values):
+    n = np.sum(~np.isnan(values), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nansum(values, axis=0) / n
+        var = np.nansum((values - mean)**2, axis=0) / (n - 1)
+    return n, mean, var
+
+
+def batched_ttest(values, group, equal_var=True):
+    """Column-wise two-sample t-test of ``values[group]`` against ``values[~group]``.
+
+    ``values`` is a (samples x columns) array where NaN marks a missing
+    observation; ``group`` is a boolean mask over the rows. Matches
+    ``ttest_ind(a, b, equal_var=equal_var)`` column by column. Returns
+    ``(statistic, pvalue)`` arrays.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    group = np.asarray(group, dtype=bool)
+    if values.ndim != 2 or group.shape != (values.shape[0],):
+        raise ValueError('values must be 2-D with one group flag per row')
+
+    n1, mean1, var1 = _moments(values[group])
+    n2, mean2, var2 = _moments(values[~group])
+    return ttest_from_moments(n1, mean1, var1, n2, mean2, var2, equal_var)
+
+
+def ttest_from_moments(n1, mean1, var1, n2, mean2, var2, equal_var=True):
+    """t-test from per-group counts, means and sample variances (element-wise)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if equal_var:
+            dof = n1 + n2 - 2.0
+            pooled = ((n1 - 1)*var1 + (n2 - 1)*var2) / dof
+            denom = np.sqrt(pooled*(1.0/n1 + 1.0/n2))
+        else:
+            v1, v2 = var1/n1, var2/n2
+            dof = (v1 + v2)**2 / (v1**2/(n1 - 1) + v2**2/(n2 - 1))
+            denom = np.sqrt(v1 + v2)
+        statistic = (mean1 - mean2) / denom
+    #two-sided p-value from the Student t CDF (scipy.special is much cheaper to import than scipy.stats)
+    pvalue = 2*stdtr(dof, -np.abs(statistic))
+    return statistic, pvalue
+
+
+def moments_from_sums(n, total, total_sq):
+    """Mean and sample variance from a count, a sum and a sum of squares."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / n
+        var = np.maximum(total_sq - n*mean**2, 0) / (n - 1)
+    return mean, var
+
+
+def normalized_matrix(cube):
+    """(dates x slots) rides divided by each date's total; NaN where a slot had no rides."""
+    grid = cube.by_date_slot().astype(np.float64)
+    totals = grid.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normalized = grid / totals
+    normalized[grid == 0] = np.nan
+    return normalized
+
+
+def weekday_weekend_ttest(cube, equal_var=True):
+    """Per-slot t-test of normalized rides, weekdays (Mon-Fri) vs weekends.
+
+    Returns a frame indexed by ``Time`` with ``statistic`` and ``pvalue``
+    columns, the layout of cell 66's ``ttestvals``. Set ``equal_var=False``
+    for Welch's test.
+    """
+    weekday = cube.weekdays < 5
+    statistic, pvalue = batched_ttest(normalized_matrix(cube), weekday, equal_var=equal_var)
+    return pd.DataFrame({'statistic': statistic, 'pvalue': pvalue},
+                        index=pd.Index(cube.times, name='Time'))
@@ -0,0 +1,107 @@
+"""Chunked aggregation over several monthly ``uber-raw-data-*.csv`` files.
+
+Only the running aggregates stay in memory: counts per 15-minute
+``BinnedHour`` bin, per date and per ``Base``. They are enough to draw the
+'Uber Rides per day' bar chart and the cell 25 base countplot for any number
+of months.
+"""
+import glob
+
+import pandas as pd
+
+from .ingest import CSV_DTYPES, parse_datetime
+
+DEFAULT_CHUNK_SIZE = 500000
+
+BIN_WIDTH = '15min'
+
+BaseMapper = {'B02512': 'Unter', 'B02598': 'Hinter', 'B02617': 'Weiter', 'B02682': 'Schmecken', 'B02764': 'Danach-NY'}
+
+
+def monthly_files(pattern):
+    files = sorted(glob.glob(pattern))
+    if not files:
+        raise FileNotFoundError('no files match %r' % pattern)
+    return files
+
+
+def iter_chunks(pattern, chunksize=DEFAULT_CHUNK_SIZE):
+    """Yield parsed frames of at most ``chunksize`` rows from every matching file."""
+    for path in monthly_files(pattern):
+        with pd.read_csv(path, dtype=CSV_DTYPES, chunksize=chunksize) as reader:
+            for chunk in reader:
+                chunk['Date/Time'] = parse_datetime(chunk['Date/Time'])
+                yield chunk
+
+
+def _accumulate(total, part):
+    if total is None:
+        return part
+    return total.add(part, fill_value=0).astype('int64')
+
+
+class StreamAggregates:
+    """Running BinnedHour / date / Base counts, updated one chunk at a time."""
+
+    def __init__(self, bin_width=BIN_WIDTH):
+        self.bin_width = bin_width
+        self.rows = 0
+        self.binned = None
+        self.daily = None
+        self.bases = None
+
+    def update(self, chunk):
+        binned = chunk['Date/Time'].dt.floor(self.bin_width)
+        self.rows += len(chunk)
+        self.binned = _accumulate(self.binned, binned.value_counts())
+        self.daily = _accumulate(self.daily, binned.dt.normalize().value_counts())
+        self.bases = _accumulate(self.bases, chunk['Base'].astype(str).value_counts())
+        return self
+
+    def binned_counts(self):
+        """Rides per BinnedHour, as cell 10/11's ``value_counts`` would give."""
+        return self.binned.sort_index().rename_axis('BinnedHour').rename('Rides')
+
+    def rides_per_day(self):
+        return self.daily.sort_index().rename_axis('Date').rename('Rides')
+
+    def base_counts(self):
+        return self.bases.sort_index().rename_axis('Base').rename('Rides')
+
+
+def aggregate_files(pattern, chunksize=DEFAULT_CHUNK_SIZE, bin_width=BIN_WIDTH):
+    agg = StreamAggregates(bin_width)
+    for chunk in iter_chunks(pattern, chunksize):
+        agg.update(chunk)
+    return agg
+
+
+def plot_rides_per_day(agg, ax=None):
+    import matplotlib.pyplot as plt
+
+    daily = agg.rides_per_day()
+    if ax is None:
+        plt.figure(figsize=(15, 8))
+        ax = plt.gca()
+    daily.index = daily.index.strftime('%m-%d')
+    daily.plot(kind='bar', color='green', ax=ax)
+    for item in ax.get_xticklabels():
+        item.set_rotation(45)
+    ax.set_title('Uber Rides per day at NYC')
+    ax.set_xlabel('Days')
+    ax.set_ylabel('Rides')
+    return ax
+
+
+def plot_base_counts(agg, ax=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    bases = agg.base_counts()
+    if ax is None:
+        plt.figure(figsize=(12, 10))
+        ax = plt.gca()
+    ax = sns.barplot(x=bases.index.map(lambda b: BaseMapper.get(b, b)), y=bases.to_numpy(), ax=ax)
+    ax.set_ylabel('Total rides')
+    ax.set_title('Total uber rides vs Base, NYC')
+    return ax
@@ -0,0 +1,75 @@
+"""Synthetic pickups resembling the 2014 NYC data, for benchmarks.
+
+Locations are drawn from a mixture of Gaussians around Manhattan, Brooklyn and
+the airports; timestamps follow July-like weekday/weekend diurnal profiles;
+``Base`` uses the five 2014 base codes with roughly the July shares.
+"""
+import numpy as np
+import pandas as pd
+
+BASES = ['B02512', 'B02598', 'B02617', 'B02682', 'B02764']
+BASE_SHARES = [0.050, 0.311, 0.398, 0.226, 0.015]
+
+#(share, lat, lon, sd lat, sd lon)
+CLUSTERS = [
+    (0.42, 40.7550, -73.9820, 0.015, 0.012),   #Midtown
+    (0.20, 40.7220, -73.9980, 0.012, 0.010),   #Downtown
+    (0.12, 40.7790, -73.9640, 0.015, 0.012),   #Upper East/West Side
+    (0.14, 40.6900, -73.9600, 0.030, 0.030),   #Brooklyn
+    (0.03, 40.6450, -73.7820, 0.006, 0.006),   #JFK
+    (0.03, 40.7740, -73.8720, 0.004, 0.004),   #LaGuardia
+    (0.06, 40.7400, -73.9500, 0.120, 0.150),   #everything else
+]
+
+#relative rides per hour of day
+WEEKDAY_PROFILE = [4.0, 2.5, 1.6, 1.4, 1.8, 2.6, 4.6, 6.8, 7.6, 6.2, 5.4, 5.4,
+                   5.8, 5.8, 6.6, 7.6, 8.8, 9.8, 10.0, 9.2, 8.4, 8.2, 7.8, 6.0]
+WEEKEND_PROFILE = [8.4, 7.4, 6.0, 4.6, 3.0, 1.8, 1.6, 2.0, 2.6, 3.6, 4.6, 5.4,
+                   6.0, 6.4, 6.6, 6.8, 7.0, 7.2, 7.6, 7.6, 7.4, 7.8, 8.6, 9.0]
+#relative rides per weekday, Monday first
+WEEKDAY_WEIGHTS = [0.92, 1.05, 1.10, 1.15, 1.08, 0.90, 0.72]
+
+
+def _minute_probabilities(profile):
+    per_minute = np.repeat(np.asarray(profile, dtype=np.float64), 60)
+    return per_minute / per_minute.sum()
+
+
+def synthetic_pickups(rows, start='2014-07-01', days=31, seed=0):
+    """Frame with the raw ``Date/Time``, ``Lat``, ``Lon``, ``Base`` columns (Date/Time parsed)."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days, freq='D')
+    day_weights = np.asarray(WEEKDAY_WEIGHTS)[dates.weekday]
+    day = rng.choice(days, size=rows, p=day_weights / day_weights.sum())
+    weekend = dates.weekday.to_numpy()[day] >= 5
+
+    minute = np.empty(rows, dtype=np.int64)
+    for mask, profile in ((~weekend, WEEKDAY_PROFILE), (weekend, WEEKEND_PROFILE)):
+        minute[mask] = rng.choice(24*60, size=int(mask.sum()), p=_minute_probabilities(profile))
+    offsets = day.astype(np.int64)*24*60 + minute
+    order = np.argsort(offsets, kind='stable')
+    stamps = dates[0] + pd.to_timedelta(offsets[order], unit='m')
+
+    shares = np.array([c[0] for c in CLUSTERS])
+    cluster = rng.choice(len(CLUSTERS), size=rows, p=shares / shares.sum())
+    params = np.array([c[1:] for c in CLUSTERS])[cluster]
+    lat = rng.normal(params[:, 0], params[:, 2]).round(4)
+    lon = rng.normal(params[:, 1], params[:, 3]).round(4)
+    base = rng.choice(len(BASES), size=rows, p=BASE_SHARES)
+
+    return pd.DataFrame({'Date/Time': stamps, 'Lat': lat, 'Lon': lon,
+                         'Base': pd.Categorical.from_codes(base, categories=BASES)})
+
+
+def format_datetime(stamps):
+    """Timestamps in the raw files' format, e.g. '7/1/2014 0:03:00'."""
+    stamps = pd.Series(stamps)
+    return (stamps.dt.month.astype(str) + '/' + stamps.dt.day.astype(str) + '/' + stamps.dt.year.astype(str)
+            + ' ' + stamps.dt.hour.astype(str) + stamps.dt.strftime(':%M:%S'))
+
+
+def write_raw_csv(frame, path):
+    """Write ``frame`` in the layout of the raw ``uber-raw-data-*.csv`` files."""
+    raw = pd.DataFrame({'Date/Time': format_datetime(frame['Date/Time']), 'Lat': frame['Lat'],
+                        'Lon': frame['Lon'], 'Base': frame['Base'].astype(str)})
+    raw.to_csv(path, index=False)